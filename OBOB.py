@@ -1,11 +1,37 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import pandas as pd
-import os
 from datetime import datetime, timedelta
-import plotly.express as px
-import base64
-import gspread
-from google.oauth2.service_account import Credentials
+from monitoring.alerts import AlertStore, DeviationScanner
+from monitoring.analytics import kpis, kpi_series, running_percentage_by_area as area_running_percentages, weekly_deviations
+from monitoring.charts import TREND_METRICS, kpi_figures, trend_figures, trend_frame
+from monitoring.export import FORMATS as EXPORT_FORMATS, export_report
+from monitoring.health import SOURCE_COLUMNS as HEALTH_COLUMNS, fleet_health, health_figure
+from monitoring.importer import import_file
+from monitoring.parallel import Evaluator
+from monitoring.rolling import TrendMonitor, load_settings as load_trend_settings
+from monitoring.rollup import empty as empty_rollup
+from monitoring.schema import SHEET_COLUMNS
+from monitoring.sheets import SheetConnection, open_worksheet as open_google_worksheet
+from monitoring.storage import GoogleSheetsStorage, SQLiteStorage
+from monitoring.sync import SheetMirror
+from monitoring.thresholds import load_thresholds
+from monitoring.timing import TIMINGS, CountedWorksheet, append_jsonl, span
+from monitoring.wal import WriteAheadLog
+
+def setting(key, default):
+    """Read a setting from .streamlit/secrets.toml, or its default (also when there is no secrets file)."""
+    try:
+        return st.secrets.get(key, default)
+    except (FileNotFoundError, StreamlitAPIException):
+        return default  # ✅ No secrets file: the passkey page still shows, and the Sheets error is reported after login
+
+# ✅ Timing of each stage, per rerun and rolling (off by default; admins see it in the sidebar)
+PERF_TIMINGS = bool(setting("PERF_TIMINGS", False))
+PERF_LOG_PATH = setting("PERF_LOG_PATH", "")
+PERF_METRICS_PATH = setting("PERF_METRICS_PATH", "")
+TIMINGS.enabled = PERF_TIMINGS
+TIMINGS.start_run()
 
 st.markdown(
     """
@@ -29,6 +55,9 @@ st.markdown(
 # ✅ Set your passkey (Change this to your desired passkey)
 PASSKEY = "indorama2024"  # 🔥 Change this to your secret passkey
 
+# ✅ Logging in with the admin passkey (if set) also shows the performance panel
+ADMIN_PASSKEY = setting("ADMIN_PASSKEY", "")
+
 # ✅ Check if user is authenticated
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False  # Default to False
@@ -42,8 +71,9 @@ if not st.session_state.authenticated:
 
     # Verify passkey
     if st.button("Unlock"):
-        if passkey_input == PASSKEY:
+        if passkey_input == PASSKEY or (ADMIN_PASSKEY and passkey_input == ADMIN_PASSKEY):
             st.session_state.authenticated = True  # Set authentication to True
+            st.session_state.is_admin = bool(ADMIN_PASSKEY) and passkey_input == ADMIN_PASSKEY
             st.session_state.page = "main"  # ✅ Reset to main page after login
             st.success("✅ Access Granted! Welcome to the App.")
             st.rerun()  # ✅ Refresh app
@@ -59,184 +89,43 @@ st.sidebar.success("🔓 Access Granted")
 
 if st.sidebar.button("🔒 Logout"):
     st.session_state.authenticated = False  # Reset authentication state
+    st.session_state.is_admin = False
     st.session_state.page = "passkey"  # Redirect to Passkey page
     st.rerun()  # Refresh app to apply changes
 
-# Define deviation thresholds for specific equipment
-equipment_thresholds = ({
-    # 1670
-    "1670-PA-02A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1670-PA-02B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1670-PA-02C": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1670-PA-04A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1670-PA-04B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1670-PA-04C": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PH-01A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PH-01B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PH-01C": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PA-01A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PA-01B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PA-01C": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PA-03A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PA-03B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-    "1670-PA-03C": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                }, 
-
-    # 1600
-    "1600-PA-04A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1600-PA-04B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1600-KF-02A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1600-KF-02B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1600-KF-02C": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-# 1680
-    "1680-PA-01A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1680-PA-01B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1680-PH-01A": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-    "1680-PH-01B": {"Driving End Temp": {"min": 0, "max": 70}, "Driven End Temp": {"min": 0, "max": 70},
-                "DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "NDE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor Driving End Temp": {"min": 0, "max": 70}, "Motor Driven End Temp": {"min": 0, "max": 70}, "Motor DE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Horizontal RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Vertical RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Vertical RMS (mm/s)": {"min": 0, "max": 6}, 
-                    "Motor DE Axial RMS (mm/s)": {"min": 0, "max": 6}, "Motor NDE Axial RMS (mm/s)": {"min": 0, "max": 6}
-                },
-})
-
-
-# ✅ Authenticate Google Sheets with the correct scope
-def authenticate_google_sheets():
-    try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", 
-                  "https://www.googleapis.com/auth/drive"]  # Added Drive access for permission issues
-        
-        creds = Credentials.from_service_account_info(st.secrets["GOOGLE_SHEET_KEY"], scopes=scopes)
-        return gspread.authorize(creds)
-    except Exception as e:
-        st.error(f"❌ Google Sheets authentication failed: {e}")
-        return None
+# ✅ Deviation thresholds and equipment per area (configured in monitoring/thresholds.json)
+threshold_table = load_thresholds()
+equipment_lists = threshold_table.equipment_lists()
+
 
-# ✅ Connect to Google Sheets
-client = authenticate_google_sheets()
-if client:
+# ✅ Storage backend: "sheets" (Google Sheets + local copy) or "sqlite" (embedded database, works offline)
+STORAGE_BACKEND = setting("STORAGE_BACKEND", "sheets")
+SQLITE_PATH = setting("SQLITE_PATH", "data/obob.sqlite3")
+
+# ✅ Seconds between health checks of the shared Google Sheets connection
+SHEET_HEALTH_CHECK_INTERVAL = int(setting("SHEET_HEALTH_CHECK_INTERVAL", 300))
+
+def sheet_is_healthy(connection):
+    """Re-check the connection at most every SHEET_HEALTH_CHECK_INTERVAL seconds; False forces a reconnect."""
+    return connection.is_healthy(SHEET_HEALTH_CHECK_INTERVAL)
+
+def open_worksheet():
+    """Authorize with the service account from the secrets and open Sheet2 (API calls are counted)."""
+    with span("sheets.open"):
+        return CountedWorksheet(open_google_worksheet(st.secrets["GOOGLE_SHEET_KEY"]))
+
+@st.cache_resource(show_spinner=False, validate=sheet_is_healthy)
+def connect_sheet():
+    """Open Sheet2 once per process (re-created when the health check fails or it is cleared)."""
+    return SheetConnection(open_worksheet())
+
+# ✅ Connect to Google Sheets (the app stays usable read-only from the local copy if this fails)
+if STORAGE_BACKEND == "sheets":
     try:
-        sheet = client.open("INDORAMA LLF").worksheet("Sheet2")
+        connect_sheet()
         st.success("✅ Connected to Google Sheets successfully!")
     except Exception as e:
-        st.error(f"❌ Unable to open Google Sheet: {e}")
-else:
-    st.stop()
+        st.warning(f"⚠️ Unable to connect to Google Sheets ({e}). Showing the local copy of the data; new readings cannot be saved right now.")
 
 # Apply CSS for black buttons
 st.markdown(
@@ -279,60 +168,405 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# ✅ Load existing data from Google Sheets
-def load_data():
-    """Fetch data from Google Sheets."""
+# ✅ Local copy of Sheet2: where it is stored and how often new rows are pulled from Google Sheets
+LOCAL_STORE_DIR = setting("LOCAL_STORE_DIR", "data/sheet2")
+SYNC_INTERVAL = int(setting("SYNC_INTERVAL", 60))
+
+# ✅ Seconds an in-memory copy of the data is reused before it is read again
+DATA_CACHE_TTL = int(setting("DATA_CACHE_TTL", 300))
+
+# ✅ Largest weekly report offered as a download (the browser download is held in memory; use the CLI beyond it)
+DOWNLOAD_MAX_ROWS = int(setting("DOWNLOAD_MAX_ROWS", 100000))
+
+# ✅ Most points drawn per trend line (about twice the chart width in pixels)
+CHART_MAX_POINTS = int(setting("CHART_MAX_POINTS", 1000))
+
+@st.cache_resource(show_spinner=False)
+def open_storage():
+    """Storage backend shared by all sessions (one per process)."""
+    if STORAGE_BACKEND == "sqlite":
+        return SQLiteStorage(SQLITE_PATH)
+
+    # Google Sheets: reads come from a local Parquet copy kept up to date by a background sync thread
+    mirror = SheetMirror(open_worksheet, LOCAL_STORE_DIR)
+    mirror.start(SYNC_INTERVAL)  # ✅ On first start the local copy is filled in the background; pages do not wait for it
+    return GoogleSheetsStorage(lambda: connect_sheet().worksheet, mirror)
+
+storage = open_storage()
+
+# ✅ Worker processes for threshold checks, rolling statistics and the weekly report (1 = evaluate in the app)
+EVAL_WORKERS = int(setting("EVAL_WORKERS", 1))
+EVAL_POOL = setting("EVAL_POOL", "process")
+
+@st.cache_resource(show_spinner=False)
+def open_evaluator():
+    """Parallel evaluator shared by all sessions (one pool per process), or None to evaluate serially."""
+    if EVAL_WORKERS <= 1:
+        return None
+    return Evaluator(threshold_table, EVAL_WORKERS, kind=EVAL_POOL)
+
+evaluator = open_evaluator()
+SCAN_BATCH_ROWS = 50000 if evaluator else 5000  # Large enough batches to be worth spreading over the workers
+
+# ✅ Alerts are precomputed by a background scanner as readings arrive
+ALERTS_PATH = setting("ALERTS_PATH", "data/alerts.sqlite3")
+SCAN_INTERVAL = int(setting("SCAN_INTERVAL", 60))
+
+@st.cache_resource(show_spinner=False)
+def open_alert_scanner():
+    """Start the background deviation scanner (one per process)."""
+    scanner = DeviationScanner(
+        open_storage(), threshold_table, AlertStore(ALERTS_PATH), SCAN_BATCH_ROWS, open_evaluator()
+    )
+    scanner.start(SCAN_INTERVAL)
+    return scanner
+
+scanner = open_alert_scanner()
+
+@st.cache_resource(show_spinner=False)
+def open_trend_monitor():
+    """Rolling statistics of every equipment and metric for early warnings (one per process)."""
+    monitor = TrendMonitor(
+        open_storage(), threshold_table, load_trend_settings(), SCAN_BATCH_ROWS, open_evaluator()
+    )
+    monitor.start(SCAN_INTERVAL)  # ✅ Catches up on the history in the background, then follows new readings
+    return monitor
+
+trend_monitor = open_trend_monitor()
+
+# ✅ Submitted readings are kept in a local write-ahead log until the backend has them
+WAL_PATH = setting("WAL_PATH", "data/pending.sqlite3")
+FLUSH_INTERVAL = int(setting("FLUSH_INTERVAL", 30))
+
+def refresh_after_flush(written):
+    """Pull flushed readings into the local copy, alerts and trends right away."""
+    try:
+        storage.sync()
+        scanner.scan()
+        trend_monitor.update()
+    except Exception:
+        pass  # The background sync and scan will pick them up
+
+@st.cache_resource(show_spinner=False)
+def open_write_ahead_log():
+    """Start the background flusher of submitted readings (one per process)."""
+    wal = WriteAheadLog(WAL_PATH, open_storage(), on_flush=refresh_after_flush)
+    wal.start(FLUSH_INTERVAL)
+    return wal
+
+wal = open_write_ahead_log()
+
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=2, show_spinner=False)
+def read_daily_rollup(version):
+    """Read the daily rollup. Cached per storage version and shared by all sessions."""
+    return open_storage().daily_rollup()
+
+def load_daily_rollup():
+    """Load the daily rollup (per date, area and equipment) for the KPIs and charts."""
+    try:
+        return read_daily_rollup(storage.version)
+    except Exception as e:
+        st.error(f"Error loading daily rollup: {e}")
+        return empty_rollup()
+
+def query_readings(equipment, start_date, end_date):
+    """Load the readings of one equipment tag in a date range from the storage backend."""
     try:
-        data = sheet.get_all_records()
-        return pd.DataFrame(data)
+        with span("storage.query"):
+            return storage.query(equipment, start_date, end_date)
     except Exception as e:
-        st.error(f"Error loading data from Google Sheets: {e}")
+        st.error(f"Error loading data: {e}")
         return pd.DataFrame()
+
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=32, show_spinner=False)
+def read_trend_figures(version, equipment, start_date, end_date, limits_equipment):
+    """Build every trend figure for a query. Cached per query and storage version."""
+    with span("storage.query"):
+        data = open_storage().query(equipment, start_date, end_date, columns=["Date", "Equipment", *TREND_METRICS])
+    with span("charts.trend_figures"):
+        trends = trend_frame(data, TREND_METRICS, threshold_table, CHART_MAX_POINTS)
+        return trend_figures(trends, threshold_table.limits(limits_equipment))
+
+def show_chart(fig):
+    """Draw a Plotly figure (its serialization is timed)."""
+    with span("plotly.render"):
+        st.plotly_chart(fig)
+
+def load_trend_figures(scope, limits_equipment):
+    """Load the trend figures for (equipment, start date, end date), None meaning all, with limits of one tag."""
+    try:
+        return read_trend_figures(storage.version, *scope, limits_equipment)
+    except Exception as e:
+        st.error(f"Error loading chart data: {e}")
+        return []
+
+if storage.last_error is not None:
+    st.sidebar.warning("⚠️ Syncing with Google Sheets failed. Showing the last synced data.")
+elif STORAGE_BACKEND == "sheets" and storage.mirror.synced_rows == 0 and storage.mirror.last_synced_at is None:
+    st.sidebar.info("⏳ Loading readings from Google Sheets in the background...")
+pending_readings = wal.pending()
+if pending_readings:
+    st.sidebar.info(f"⏳ {pending_readings} submitted reading(s) waiting to be saved to {storage.name}.")
+if wal.last_error is not None:
+    st.sidebar.warning(f"⚠️ Saving submitted readings failed, retrying in the background: {wal.last_error}")
+    if STORAGE_BACKEND == "sheets":
+        connect_sheet.clear()  # ✅ Reconnect to Google Sheets for the next retry
     
 # Initialize session state variables
 if "page" not in st.session_state:
     st.session_state.page = "main"  # Set default page to "main"
 
-def validate_columns(df, required_columns):
-    missing = [col for col in required_columns if col not in df.columns]
-    if missing:
-        st.error(f"Missing columns in dataset: {', '.join(missing)}")
-        return False
-    return True
-
 # Add Utility Functions Here
-def calculate_kpis():
-    """Calculate KPIs and return data for charts."""
-    data = load_data()
-    if data.empty:
-        return {
-            "avg_temp": "No Data",
-            "running_percentage": "No Data",
-            "data": data
-        }
-
-    # ✅ Ensure "Is Running" column exists and convert properly
-    if "Is Running" not in data.columns:
-        raise KeyError("❌ 'Is Running' column is missing in the dataset!")
-    
-    data["Is Running"] = data["Is Running"].astype(str).str.lower().map({"true": 1, "false": 0, "1": 1, "0": 0}).fillna(0)
-    
-    # ✅ Ensure "Driving End Temp" and "Driven End Temp" exist & are numeric
-    for col in ["Driving End Temp", "Driven End Temp"]:
-        if col not in data.columns:
-            data[col] = 0  # Set default value
-        data[col] = pd.to_numeric(data[col], errors="coerce")
-    
-    # ✅ Compute KPIs safely
-    avg_temp = data[["Driving End Temp", "Driven End Temp"]].mean().mean() if not data[["Driving End Temp", "Driven End Temp"]].empty else 0
-    running_percentage = (data["Is Running"].sum() / len(data)) * 100 if len(data) > 0 else 0
-    
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=2, show_spinner=False)
+def calculate_kpis(version):
+    """Calculate KPIs from the daily rollup. Cached per storage version."""
+    # ✅ Totals come from the daily rollup, not from raw readings
+    values = kpis(read_daily_rollup(version))
+    if values is None:
+        return {"avg_temp": "No Data", "running_percentage": "No Data"}
     return {
-        "avg_temp": f"{avg_temp:.2f}°C",
-        "running_percentage": f"{running_percentage:.2f}%",
-        "data": data
+        "avg_temp": f"{values['avg_temp']:.2f}°C",
+        "running_percentage": f"{values['running_percentage']:.2f}%",
     }
 
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=8, show_spinner=False)
+def scan_weekly_deviations(version, start_date, end_date):
+    """Check running equipment in a date range against thresholds. Cached per range and storage version.
+
+    Returns (number of running readings, deviating rows, their violation flags, their recommendations).
+    """
+    return weekly_deviations(open_storage().query(start=start_date, end=end_date), threshold_table, open_evaluator())
+
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=2, show_spinner=False)
+def running_percentage_by_area(version):
+    """Percentage of running readings per area, from the daily rollup. Cached per storage version."""
+    return area_running_percentages(read_daily_rollup(version))
+
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=2, show_spinner=False)
+def read_kpi_figures(version):
+    """Average temperature trend and running equipment by area charts. Cached per storage version."""
+    daily = read_daily_rollup(version)
+    with span("charts.kpi_figures"):
+        return kpi_figures(*kpi_series(daily))
+
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=2, show_spinner=False)
+def read_fleet_health(version):
+    """Health ranking and heatmap from the latest reading of every equipment. Cached per storage version."""
+    with span("fleet_health"):
+        latest = open_storage().latest(HEALTH_COLUMNS + threshold_table.metrics)
+        health, ranking = fleet_health(latest, threshold_table)
+        return ranking, health_figure(health)
+
+@st.cache_data(ttl=DATA_CACHE_TTL, max_entries=4, show_spinner=False)
+def read_alerts(version, start_date, end_date):
+    """Alert counts per equipment and metric and the latest alerts in a date range. Cached per alert store version."""
+    return scanner.store.summary(start_date, end_date), scanner.store.query(start=start_date, end=end_date, limit=200)
+
+@st.fragment
+def alerts_section():
+    """Threshold alerts from the background scanner (read when shown; no scan happens here)."""
+    st.subheader("🚨 Threshold Alerts (Last 7 Days)")
+    if not st.toggle("Show threshold alerts", key="show_alerts"):
+        return
+    if scanner.last_error is not None:
+        st.warning(f"⚠️ Alert scan failed, alerts may be out of date: {scanner.last_error}")
+    end_date = datetime.now().date()
+    try:
+        summary, latest = read_alerts(scanner.store.version, end_date - timedelta(days=7), end_date)
+    except Exception as e:
+        st.error(f"Error loading alerts: {e}")
+        return
+
+    if summary.empty:
+        st.success("✅ No threshold alerts for running equipment in the last 7 days.")
+        return
+    col1, col2 = st.columns(2)
+    col1.metric("Alerts", f"{int(summary['Alerts'].sum()):,}")
+    col2.metric("Equipment with Alerts", summary["Equipment"].nunique())
+    st.dataframe(summary, hide_index=True)
+    with st.expander("Latest Alerts"):
+        st.dataframe(latest, hide_index=True)
+
+@st.fragment
+def early_warning_section():
+    """Metrics still within limits whose rolling trend is rising fast or nears the max limit (kept up to date in the background)."""
+    st.subheader("📈 Early Warnings")
+    if not st.toggle("Show early warnings", key="show_early_warnings"):
+        return
+    if trend_monitor.last_updated_at is None:
+        if trend_monitor.last_error is not None:
+            st.error(f"Error updating trends: {trend_monitor.last_error}")
+        else:
+            st.info("⏳ Early warnings are warming up: the rolling statistics are being built from the history.")
+        return
+    if trend_monitor.last_error is not None:
+        st.warning(f"⚠️ Trend update failed, early warnings may be out of date: {trend_monitor.last_error}")
+    try:
+        warnings = trend_monitor.warnings()
+    except Exception as e:
+        st.error(f"Error calculating early warnings: {e}")
+        return
+
+    if warnings.empty:
+        st.success("✅ No rising trends detected.")
+        return
+    st.dataframe(
+        warnings[["Equipment", "Metric", "Last", "EWMA", "Slope per Day", "Max Limit", "Days to Limit", "Reason"]],
+        hide_index=True,
+    )
+
+@st.fragment
+def fleet_health_section():
+    """Health score of every equipment from its latest reading, worst first (computed when shown)."""
+    st.subheader("🩺 Fleet Health")
+    if not st.toggle("Show fleet health", key="show_fleet_health"):
+        return
+    try:
+        ranking, fig = read_fleet_health(storage.version)
+    except Exception as e:
+        st.error(f"Error calculating fleet health: {e}")
+        return
+
+    if ranking["Rank"].isna().all():
+        st.info("No running equipment readings to score yet.")
+        return
+    st.dataframe(
+        ranking,
+        hide_index=True,
+        column_config={"Health Score": st.column_config.ProgressColumn("Health Score", min_value=0, max_value=100, format="%.1f")},
+    )
+    with st.expander("Health Heatmap"):
+        show_chart(fig)
+
+def kpi_section():
+    """Key performance indicators."""
+    st.subheader("Key Performance Indicators (KPIs)")
+    try:
+        kpis = calculate_kpis(storage.version)
+    except Exception as e:
+        st.error(f"Error calculating KPIs: {e}")
+        return
+    col1, col2 = st.columns(2)
+    col1.metric("Average Temperature", kpis["avg_temp"])
+    col2.metric("Running Equipment", kpis["running_percentage"])
+
+@st.fragment
+def weekly_report_section():
+    """Deviations of running equipment from their thresholds in a date range (computed when shown)."""
+    st.title("Weekly Report Dashboard")
+    if not st.toggle("Show weekly deviation report", key="show_weekly_report"):
+        return
+
+    # ✅ Filter by date range
+    start_date = st.date_input("Start Date", value=datetime.now() - timedelta(days=7), key="weekly_report_start_date")
+    end_date = st.date_input("End Date", value=datetime.now(), key="weekly_report_end_date")
+
+    if load_daily_rollup().empty:
+        st.warning("No data available. Please enter condition monitoring data first.")
+        return
+
+    # ✅ Only the selected date range is read, and the scan is cached per range
+    try:
+        running_count, deviation_data, violations, recommendations = scan_weekly_deviations(
+            storage.version, start_date, end_date
+        )
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return
+
+    if running_count == 0:
+        st.success("✅ All equipment is operating within thresholds, or no running equipment was found for the selected date range.")
+    elif deviation_data.empty:
+        st.success("✅ All running equipment is within the specified thresholds.")
+    else:
+        st.subheader("⚠️ Running Equipment with Deviations")
+        st.dataframe(deviation_data)
+
+        # ✅ Recommendations from the same violation matrix
+        st.write("### 🔍 Recommendations")
+        if any(recommendations):
+            for row_recommendations in recommendations:
+                for rec in row_recommendations:
+                    st.info(rec)
+        else:
+            st.success("✅ No immediate issues detected in the deviations data.")
+        # ✅ Add CSS to make the "Download Report" button black
+        st.markdown(
+            """
+            <style>
+            div.stDownloadButton > button {
+                background-color: black !important;
+                color: white !important;
+                border-radius: 10px !important;
+                padding: 10px 15px !important;
+                font-size: 16px !important;
+                font-weight: bold !important;
+                border: 2px solid white !important;
+            }
+        
+            div.stDownloadButton > button:hover {
+                background-color: #333 !important;
+                color: white !important;
+            }
+            </style>
+            """,
+            unsafe_allow_html=True
+        )
+        # ✅ Download Weekly Report: built on request from the scan above, written in chunks
+        st.write("#### Download Weekly Report")
+        if len(deviation_data) > DOWNLOAD_MAX_ROWS:
+            st.warning(
+                f"⚠️ This report has {len(deviation_data):,} deviating rows, more than the {DOWNLOAD_MAX_ROWS:,} "
+                "that can be downloaded here. Write it on the server instead with "
+                f"`python -m monitoring report --start {start_date} --end {end_date}`."
+            )
+            return
+        report_format = st.selectbox("Format", options=list(EXPORT_FORMATS), key="weekly_report_format")
+        if st.button("Prepare Report"):
+            extension, mime = EXPORT_FORMATS[report_format]
+            report_file = export_report(deviation_data, violations, recommendations, report_format)
+            st.download_button(
+                f"Download Report as {report_format}",
+                data=report_file,
+                file_name=f"weekly_report_{start_date}_{end_date}.{extension}",
+                mime=mime,
+                on_click="ignore",
+            )
+
+def area_running_section():
+    """Percentage of running equipment per area."""
+    st.subheader("Running Equipment by Area")
+    if load_daily_rollup().empty:
+        st.warning("No data available to calculate running equipment percentages.")
+        return
+    try:
+        st.table(running_percentage_by_area(storage.version))
+    except Exception as e:
+        st.error(f"Error calculating running percentages: {e}")
+
+@st.fragment
+def kpi_charts_section():
+    """Average temperature and running equipment charts (computed when shown)."""
+    st.subheader("KPI Charts")
+    if not st.toggle("Show KPI charts", key="show_kpi_charts"):
+        return
+    if load_daily_rollup().empty:
+        st.warning("No data available for KPI charts.")
+        return
+    try:
+        avg_temp_fig, running_fig = read_kpi_figures(storage.version)
+    except Exception as e:
+        st.error(f"Error loading chart data: {e}")
+        return
+
+    # Average Temperature Trend: average of the driving and driven end temperatures per date
+    st.write("### Average Temperature Trend")
+    show_chart(avg_temp_fig)
+
+    # Running Equipment Count
+    st.write("### Running Equipment Count by Area")
+    show_chart(running_fig)
+
 # Function to set background image from an online URL
 def set_background(image_url):
     st.markdown(
@@ -375,6 +609,11 @@ if st.session_state.page == "main":
 
     st.header(greeting)
 
+    # Next Button to Navigate (first, so data entry does not wait for the dashboard)
+    if st.button("Next"):
+        st.session_state.page = "monitoring"
+        st.rerun()
+
     # Footer Section
     st.write("---")  # Separator line
     st.write("### 📜 Footer Information")
@@ -391,313 +630,30 @@ if st.session_state.page == "main":
                 For assistance or feedback, please reach out via the support link above. This application is approved by Mr. Nitin Narkhede (nitin.narkhede@indorama.com)
                 """)
 
-    # Display KPIs
-    st.subheader("Key Performance Indicators (KPIs)")
-    kpis = calculate_kpis()
-    col1, col2 = st.columns(2)
-    col1.metric("Average Temperature", kpis["avg_temp"])
-    col2.metric("Running Equipment", kpis["running_percentage"])
-
+    # ✅ Dashboard sections are computed independently, each with its own cache,
+    # and the expensive ones only when they are switched on
+    kpi_section()
     st.write("---")
-
-    # ✅ Weekly Report Dashboard
-    st.title("Weekly Report Dashboard")
-    
-    # ✅ Filter by date range
-    start_date = st.date_input("Start Date", value=datetime.now() - timedelta(days=7), key="weekly_report_start_date")
-    end_date = st.date_input("End Date", value=datetime.now(), key="weekly_report_end_date")
-    
-    # ✅ Load the data
-    data = load_data()
-    
-    if data.empty:
-        st.warning("No data available. Please enter condition monitoring data first.")
-    else:
-        # ✅ Ensure Required Columns Exist
-        required_columns = ["Date", "Equipment", "Driving End Temp", "Driven End Temp", "DE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "DE Axial RMS (mm/s)", "NDE Horizontal RMS (mm/s)", "NDE Vertical RMS (mm/s)", "NDE Axial RMS (mm/s)", 
-        "Motor Driving End Temp", "Motor Driven End Temp", "Motor DE Horizontal RMS (mm/s)", "Motor DE Vertical RMS (mm/s)", "Motor DE Axial RMS (mm/s)", "Motor NDE Horizontal RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor NDE Axial RMS (mm/s)", "Is Running"]
-        if not validate_columns(data, required_columns):
-            st.error("Dataset does not contain all required columns for analysis.")
-        else:
-            # ✅ Convert columns to correct types
-            data["Date"] = pd.to_datetime(data["Date"], errors="coerce")
-            data["Is Running"] = data["Is Running"].astype(str).str.lower() == "true"  # Convert to boolean
-            
-            # ✅ Ensure numeric values
-            for col in ["Driving End Temp", "Driven End Temp", "DE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "DE Axial RMS (mm/s)", "NDE Horizontal RMS (mm/s)", "NDE Vertical RMS (mm/s)", "NDE Axial RMS (mm/s)", 
-        "Motor Driving End Temp", "Motor Driven End Temp", "Motor DE Horizontal RMS (mm/s)", "Motor DE Vertical RMS (mm/s)", "Motor DE Axial RMS (mm/s)", "Motor NDE Horizontal RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor NDE Axial RMS (mm/s)"]:
-                data[col] = pd.to_numeric(data[col], errors="coerce")
-    
-            # ✅ Filter data based on date range and running equipment
-            filtered_data = data[
-                (data["Date"] >= pd.Timestamp(start_date)) &
-                (data["Date"] <= pd.Timestamp(end_date)) &
-                (data["Is Running"] == True)  # Only include running equipment
-            ]
-    
-            if filtered_data.empty:
-                st.success("✅ All equipment is operating within thresholds, or no running equipment was found for the selected date range.")
-            else:
-                # ✅ Check for deviations
-                deviations = []
-    
-                for _, row in filtered_data.iterrows():
-                    equipment = row["Equipment"].strip()  # Remove any extra spaces
-
-                    
-    
-                    if equipment in equipment_thresholds:
-                        thresholds = equipment_thresholds[equipment]  # ✅ Moved inside the loop
-    
-                        if (
-                            not (thresholds["Driving End Temp"]["min"] <= row["Driving End Temp"] <= thresholds["Driving End Temp"]["max"]) or
-                            not (thresholds["Driven End Temp"]["min"] <= row["Driven End Temp"] <= thresholds["Driven End Temp"]["max"]) or
-                            not (thresholds["Motor Driving End Temp"]["min"] <= row["Motor Driving End Temp"] <= thresholds["Motor Driving End Temp"]["max"]) or
-                            not (thresholds["Motor Driven End Temp"]["min"] <= row["Motor Driven End Temp"] <= thresholds["Motor Driven End Temp"]["max"]) or
-                            not (thresholds["DE Horizontal RMS (mm/s)"]["min"] <= row["DE Horizontal RMS (mm/s)"] <= thresholds["DE Horizontal RMS (mm/s)"]["max"]) or
-                            not (thresholds["NDE Horizontal RMS (mm/s)"]["min"] <= row["NDE Horizontal RMS (mm/s)"] <= thresholds["NDE Horizontal RMS (mm/s)"]["max"]) or
-                            not (thresholds["DE Vertical RMS (mm/s)"]["min"] <= row["DE Vertical RMS (mm/s)"] <= thresholds["DE Vertical RMS (mm/s)"]["max"]) or
-                            not (thresholds["NDE Vertical RMS (mm/s)"]["min"] <= row["NDE Vertical RMS (mm/s)"] <= thresholds["NDE Vertical RMS (mm/s)"]["max"]) or
-                            not (thresholds["DE Axial RMS (mm/s)"]["min"] <= row["DE Axial RMS (mm/s)"] <= thresholds["DE Axial RMS (mm/s)"]["max"]) or
-                            not (thresholds["NDE Axial RMS (mm/s)"]["min"] <= row["DE Axial RMS (mm/s)"] <= thresholds["DE Axial RMS (mm/s)"]["max"]) or
-                            not (thresholds["Motor DE Horizontal RMS (mm/s)"]["min"] <= row["Motor DE Horizontal RMS (mm/s)"] <= thresholds["Motor DE Horizontal RMS (mm/s)"]["max"]) or
-                            not (thresholds["Motor NDE Horizontal RMS (mm/s)"]["min"] <= row["Motor NDE Horizontal RMS (mm/s)"] <= thresholds["Motor NDE Horizontal RMS (mm/s)"]["max"]) or
-                            not (thresholds["Motor DE Vertical RMS (mm/s)"]["min"] <= row["Motor DE Vertical RMS (mm/s)"] <= thresholds["Motor DE Vertical RMS (mm/s)"]["max"]) or
-                            not (thresholds["Motor NDE Vertical RMS (mm/s)"]["min"] <= row["Motor NDE Vertical RMS (mm/s)"] <= thresholds["Motor NDE Vertical RMS (mm/s)"]["max"]) or
-                            not (thresholds["Motor DE Axial RMS (mm/s)"]["min"] <= row["Motor DE Axial RMS (mm/s)"] <= thresholds["Motor DE Axial RMS (mm/s)"]["max"]) or
-                            not (thresholds["Motor NDE Axial RMS (mm/s)"]["min"] <= row["Motor NDE Axial RMS (mm/s)"] <= thresholds["NDE Axial RMS (mm/s)"]["max"])
-                        ):
-                            deviations.append(row)
-    
-                deviation_data = pd.DataFrame(deviations)
-    
-                if deviation_data.empty:
-                    st.success("✅ All running equipment is within the specified thresholds.")
-                else:
-                    st.subheader("⚠️ Running Equipment with Deviations")
-                    st.dataframe(deviation_data)
-    
-                    # ✅ Generate Recommendations
-                    st.write("### 🔍 Recommendations")
-                    recommendations = []
-    
-                    for _, row in deviation_data.iterrows():
-                        equipment = row["Equipment"]
-                        thresholds = equipment_thresholds.get(equipment, {})
-    
-                        if thresholds:
-                            
-                            if not (thresholds["Driving End Temp"]["min"] <= row["Driving End Temp"] <= thresholds["Driving End Temp"]["max"]):
-                                recommendations.append(f"🔧 **{equipment}**: Driving End Temp is outside the range {thresholds['Driving End Temp']['min']} - {thresholds['Driving End Temp']['max']} °C.")
-
-                            if not (thresholds["Driven End Temp"]["min"] <= row["Driven End Temp"] <= thresholds["Driven End Temp"]["max"]):
-                                recommendations.append(f"🔧 **{equipment}**: Driven End Temp is outside the range {thresholds['Driven End Temp']['min']} - {thresholds['Driven End Temp']['max']} °C.")
-
-                            if not (thresholds["Motor Driving End Temp"]["min"] <= row["Motor Driving End Temp"] <= thresholds["Motor Driving End Temp"]["max"]):
-                                recommendations.append(f"🔧 **{equipment}**: Motor Driving End Temp is outside the range {thresholds['Motor Driving End Temp']['min']} - {thresholds['Motor Driving End Temp']['max']} °C.")
-
-                            if not (thresholds["Motor Driven End Temp"]["min"] <= row["Motor Driven End Temp"] <= thresholds["Motor Driven End Temp"]["max"]):
-                                recommendations.append(f"🔧 **{equipment}**: Motor Driven End Temp is outside the range {thresholds['Motor Driven End Temp']['min']} - {thresholds['Motor Driven End Temp']['max']} °C.")
-
-                            if not (thresholds["DE Horizontal RMS (mm/s)"]["min"] <= row["DE Horizontal RMS (mm/s)"] <= thresholds["DE Horizontal RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: DE Horizontal RMS is outside the range {thresholds['DE Horizontal RMS (mm/s)']['min']} - {thresholds['DE Horizontal RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["NDE Horizontal RMS (mm/s)"]["min"] <= row["NDE Horizontal RMS (mm/s)"] <= thresholds["NDE Horizontal RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: NDE Horizontal RMS is outside the range {thresholds['NDE Horizontal RMS (mm/s)']['min']} - {thresholds['NDE Horizontal RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["DE Vertical RMS (mm/s)"]["min"] <= row["DE Vertical RMS (mm/s)"] <= thresholds["DE Vertical RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: DE Vertical RMS is outside the range {thresholds['DE Vertical RMS (mm/s)']['min']} - {thresholds['DE Vertical RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["NDE Vertical RMS (mm/s)"]["min"] <= row["NDE Vertical RMS (mm/s)"] <= thresholds["NDE Vertical RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: NDE Vertical RMS is outside the range {thresholds['NDE Vertical RMS (mm/s)']['min']} - {thresholds['NDE Vertical RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["DE Axial RMS (mm/s)"]["min"] <= row["DE Axial RMS (mm/s)"] <= thresholds["DE Axial RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: DE Axial RMS is outside the range {thresholds['DE Axial RMS (mm/s)']['min']} - {thresholds['DE Axial RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["NDE Axial RMS (mm/s)"]["min"] <= row["NDE Axial RMS (mm/s)"] <= thresholds["NDE Axial RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: NDE Axial RMS is outside the range {thresholds['NDE Axial RMS (mm/s)']['min']} - {thresholds['NDE Axial RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["Motor DE Horizontal RMS (mm/s)"]["min"] <= row["Motor DE Horizontal RMS (mm/s)"] <= thresholds["Motor DE Horizontal RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: Motor DE Horizontal RMS is outside the range {thresholds['Motor DE Horizontal RMS (mm/s)']['min']} - {thresholds['Motor DE Horizontal RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["Motor NDE Horizontal RMS (mm/s)"]["min"] <= row["Motor NDE Horizontal RMS (mm/s)"] <= thresholds["Motor NDE Horizontal RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: Motor NDE Horizontal RMS is outside the range {thresholds['Motor NDE Horizontal RMS (mm/s)']['min']} - {thresholds['Motor NDE Horizontal RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["Motor DE Vertical RMS (mm/s)"]["min"] <= row["Motor DE Vertical RMS (mm/s)"] <= thresholds["Motor DE Vertical RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: Motor DE Vertical RMS is outside the range {thresholds['Motor DE Vertical RMS (mm/s)']['min']} - {thresholds['Motor DE Vertical RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["Motor NDE Vertical RMS (mm/s)"]["min"] <= row["Motor NDE Vertical RMS (mm/s)"] <= thresholds["Motor NDE Vertical RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: Motor NDE Vertical RMS is outside the range {thresholds['Motor NDE Vertical RMS (mm/s)']['min']} - {thresholds['Motor NDE Vertical RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["Motor DE Axial RMS (mm/s)"]["min"] <= row["Motor DE Axial RMS (mm/s)"] <= thresholds["Motor DE Axial RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: Motor DE Axial RMS is outside the range {thresholds['Motor DE Axial RMS (mm/s)']['min']} - {thresholds['Motor DE Axial RMS (mm/s)']['max']} mm/s.")
-
-                            if not (thresholds["Motor NDE Axial RMS (mm/s)"]["min"] <= row["Motor NDE Axial RMS (mm/s)"] <= thresholds["Motor NDE Axial RMS (mm/s)"]["max"]):
-                                recommendations.append(f"📊 **{equipment}**: Motor NDE Axial RMS is outside the range {thresholds['Motor NDE Axial RMS (mm/s)']['min']} - {thresholds['Motor NDE Axial RMS (mm/s)']['max']} mm/s.")
-
-                            if row["DE Oil Level"] == "Low":
-                                recommendations.append(f"🛢️ **{equipment}**: Oil level is low. Consider refilling.")
-
-                            if row["NDE Oil Level"] == "Low":
-                                recommendations.append(f"🛢️ **{equipment}**: Oil level is low. Consider refilling.")
-
-                    if recommendations:
-                        for rec in recommendations:
-                            st.info(rec)
-                    else:
-                        st.success("✅ No immediate issues detected in the deviations data.")
-                    # ✅ Add CSS to make the "Download Report" button black
-                    st.markdown(
-                        """
-                        <style>
-                        div.stDownloadButton > button {
-                            background-color: black !important;
-                            color: white !important;
-                            border-radius: 10px !important;
-                            padding: 10px 15px !important;
-                            font-size: 16px !important;
-                            font-weight: bold !important;
-                            border: 2px solid white !important;
-                        }
-                    
-                        div.stDownloadButton > button:hover {
-                            background-color: #333 !important;
-                            color: white !important;
-                        }
-                        </style>
-                        """,
-                        unsafe_allow_html=True
-                    )
-                    # ✅ Download Weekly Report
-                    st.write("#### Download Weekly Report")
-                    csv = deviation_data.to_csv(index=False)
-                    st.download_button("Download Report as CSV", data=csv, file_name="weekly_report.csv", mime="text/csv")
-
-        # Ensure data is available from KPI calculation
-    data = kpis["data"]
-
-    if not data.empty:  # Check if the data is available
-        st.write("---")
-        st.subheader("Running Equipment by Area")
-
-        # Calculate the percentage of running equipment per area
-        if "Area" in data.columns and "Is Running" in data.columns:
-            running_percentage_by_area = (
-                    data.groupby("Area")["Is Running"].mean() * 100
-            ).reset_index()
-            running_percentage_by_area.rename(
-                columns={"Is Running": "Running Percentage (%)"}, inplace=True
-            )
-
-            # Display the table
-            st.table(running_percentage_by_area)
-        else:
-            st.warning("The dataset does not contain 'Area' or 'Is Running' columns.")
-    else:
-        st.warning("No data available to calculate running equipment percentages.")
-
-    # Add KPI Charts
-    data = kpis["data"]
-    if not data.empty:  # Check if data is available
-        st.write("---")
-        st.subheader("KPI Charts")
-
-        import plotly.express as px
-
-        # Average Temperature Trend
-        if "Driving End Temp" in data.columns and "Driven End Temp" in data.columns:
-            # Calculate the average temperature
-            data["Avg Temp"] = data[["Driving End Temp", "Driven End Temp"]].mean(axis=1)
-
-            # Aggregate average temperature by date
-            avg_temp_trend = data.groupby("Date", as_index=False)["Avg Temp"].mean()
-
-            st.write("### Average Temperature Trend")
-
-            # Create a Plotly line chart
-            fig = px.line(
-                avg_temp_trend,
-                x="Date",
-                y="Avg Temp",
-                title="Average Temperature Trend Over Time",
-                labels={"Avg Temp": "Average Temperature (°C)", "Date": "Date"},
-                markers=True,  # Adds markers for each data point
-            )
-
-            # Enhance chart aesthetics
-            fig.update_traces(line=dict(width=2))
-            fig.update_layout(
-                title_font_size=18,
-                xaxis_title_font_size=14,
-                yaxis_title_font_size=14,
-                hovermode="x unified",  # Combine hover info
-            )
-
-            st.plotly_chart(fig)
-        else:
-            st.warning("Temperature data (Driving End or Driven End) is missing in the dataset.")
-
-
-        # Running Equipment Count
-        if "Is Running" in data.columns and "Area" in data.columns:
-            running_equipment_by_area = data.groupby(["Date", "Area"])["Is Running"].sum().reset_index()
-            st.write("### Running Equipment Count by Area")
-
-            # Create the bar chart with Plotly
-            fig = px.bar(
-                running_equipment_by_area,
-                x="Date",
-                y="Is Running",
-                color="Area",
-                title="Running Equipment Count by Area",
-                labels={"Is Running": "Running Equipment Count"},
-            )
-            fig.update_layout(barmode="stack")
-            st.plotly_chart(fig)
-        else:
-            st.warning("The dataset does not contain 'Is Running' or 'Area' columns.")
-
-    else:
-        st.warning("No data available for KPI charts.")
-
-
-    # Next Button to Navigate
-    if st.button("Next"):
-        st.session_state.page = "monitoring"
-        st.rerun()
+    alerts_section()
+    st.write("---")
+    early_warning_section()
+    st.write("---")
+    fleet_health_section()
+    st.write("---")
+    weekly_report_section()
+    st.write("---")
+    area_running_section()
+    st.write("---")
+    kpi_charts_section()
 
 elif st.session_state.page == "monitoring":
             
-    def filter_data(df, equipment, start_date, end_date):
-        """Filter data by equipment and date range."""
-        df["Date"] = pd.to_datetime(df["Date"])  # Convert Date column to datetime
-        filtered_df = df[
-            (df["Equipment"] == equipment) &
-            (df["Date"] >= pd.to_datetime(start_date)) &
-            (df["Date"] <= pd.to_datetime(end_date))
-            ]
-        return filtered_df
-
     # Tabs for Condition Monitoring and Report
     tab1, tab2 = st.tabs(["Condition Monitoring", "Report"])
 
     with tab1:
         st.header("Condition Monitoring Data Entry")
 
-        # Equipment lists for each area
-        equipment_lists = {
-            "1670": [
-                "1670-PA-02A", "1670-PA-02B", "1670-PA-02C", "1670-PA-03A", "1670-PA-03B", "1670-PA-03C", "1670-PA-04A", "1670-PA-04B",
-                "1670-PA-04C", "1670-PH-01A", "1670-PH-01B", "1670-PH-01C", "1670-PA-01A", "1670-PA-01B", "1670-PA-01C"
-            ],
-            "1600": [
-                "1600-PA-04A", "1600-PA-04B", "1600-KF-02A", "1600-KF-02B", "1600-KF-02C" 
-            ],
-            "1680": [
-                "1680-PA-01A", "1680-PA-01B", "1680-PH-01A", "1680-PH-01B"
-            ],
-        }
-
         # ✅ Store last selected equipment
         if "last_selected_equipment" not in st.session_state:
             st.session_state.last_selected_equipment = None
@@ -790,7 +746,7 @@ elif st.session_state.page == "monitoring":
                 equipment = st.session_state.equipment  # 🔥 Fix: Ensure we get equipment correctly
                 is_running = st.session_state.is_running
                 
-                new_data = pd.DataFrame([{
+                new_reading = {
                     "Date": date.strftime("%Y-%m-%d"),
                     "Area": area,
                     "Equipment": equipment,
@@ -817,50 +773,104 @@ elif st.session_state.page == "monitoring":
                     "Motor NDE Horizontal RMS (mm/s)": motor_nde_horizontal_vibration_rms_velocity if is_running else 0.0,
                     "Motor NDE Vertical RMS (mm/s)": motor_nde_vertical_vibration_rms_velocity if is_running else 0.0,
                     "Motor NDE Axial RMS (mm/s)": motor_nde_axial_vibration_rms_velocity if is_running else 0.0,
-                }])
+                }
         
-                # ✅ Ensure Google Sheets connection exists
-                if sheet:
-                    existing_data = sheet.get_all_records()
-                    df = pd.DataFrame(existing_data)
-                    df = pd.concat([df, new_data], ignore_index=True)
-                
-                    # ✅ Save updated data to Google Sheets
-                    sheet.clear()
-                    sheet.update([df.columns.values.tolist()] + df.values.tolist())
-                
-                    st.success("✅ Data saved to Google Sheets!")
-
-                else:
-                    st.error("❌ Unable to save data: Google Sheet connection is missing.")
+                # ✅ Record the reading locally first; the background flusher appends it to the backend
+                wal.submit(new_reading)
+                st.success(f"✅ Data recorded! It will be saved to {storage.name} in the background.")
             except Exception as e:
                 st.error(f"Error saving data: {e}")
 
+        # ✅ Bulk import: a whole route or legacy logs from a CSV/Excel file
+        with st.expander("📥 Bulk Import (CSV/Excel)"):
+            st.caption(
+                "One reading per row with the Sheet2 column names. Date, Equipment and Is Running are required; "
+                "Area is taken from the equipment tag. Rows that fail validation are skipped and listed below."
+            )
+            uploaded_file = st.file_uploader("Upload readings", type=["csv", "xlsx"], key="import_file")
+            if uploaded_file is not None and st.button("Import Readings"):
+                progress_bar = st.progress(0.0, text="Importing...")
+                file_size = max(uploaded_file.size, 1)
+
+                def show_progress(report):
+                    done = min(uploaded_file.tell() / file_size, 1.0)
+                    progress_bar.progress(done, text=f"Imported {report.rows_imported:,} of {report.rows_read:,} rows...")
+
+                report = import_file(storage, uploaded_file, uploaded_file.name, threshold_table, progress=show_progress)
+                progress_bar.empty()
+                if report.rows_imported:
+                    try:
+                        storage.sync()  # ✅ Pull the imported rows into the local copy right away
+                        scanner.scan()  # ✅ Raise alerts for the new readings without waiting for the next scan
+                        trend_monitor.update()
+                    except Exception:
+                        pass  # The background sync will pick them up
+
+                if report.error is not None:
+                    if STORAGE_BACKEND == "sheets":
+                        connect_sheet.clear()
+                    st.error(f"Import stopped after {report.rows_imported:,} rows: {report.error}")
+                else:
+                    st.success(f"✅ Imported {report.rows_imported:,} of {report.rows_read:,} rows to {storage.name}.")
+                if report.ignored_columns:
+                    st.info(f"Ignored columns: {', '.join(report.ignored_columns)}")
+                if report.rows_rejected:
+                    st.warning(f"{report.rows_rejected:,} rows were rejected.")
+                    errors = report.error_frame()
+                    st.dataframe(errors, hide_index=True)
+                    st.download_button(
+                        "Download Error Report", errors.to_csv(index=False), file_name="import_errors.csv", mime="text/csv"
+                    )
+
 
     # Tab 2: Reports and Visualizations
     with tab2:
         st.header("Reports and Visualization")
-        file_path = "data/condition_data.csv"
 
-        # Load data
-        data = load_data()
+        # ✅ The daily rollup is enough to know what has been recorded
+        recorded = load_daily_rollup()
 
-        if data.empty:
+        if recorded.empty:
             st.warning("No data available. Please enter condition monitoring data first.")
         else:
+            # ✅ Full data one page at a time: sorting, paging and column selection run in storage
             st.write("### Full Data")
-            st.dataframe(data)
+            grid_columns = st.multiselect("Columns", options=SHEET_COLUMNS, default=SHEET_COLUMNS, key="grid_columns")
+            sort_col, order_col, size_col, page_col = st.columns(4)
+            sort_by = sort_col.selectbox("Sort by", options=["Entry order"] + SHEET_COLUMNS, key="grid_sort_by")
+            descending = order_col.selectbox("Order", options=["Ascending", "Descending"], key="grid_order") == "Descending"
+            page_size = size_col.selectbox("Rows per page", options=[25, 50, 100, 250], index=1, key="grid_page_size")
+            try:
+                total_rows = storage.count()
+                page_count = max(1, -(-total_rows // page_size))
+                if st.session_state.get("grid_page", 1) > page_count:
+                    st.session_state.grid_page = page_count  # ✅ Keep the page valid when the page size grows
+                page_number = page_col.number_input(
+                    f"Page (of {page_count:,})", min_value=1, max_value=page_count, step=1, key="grid_page"
+                )
+                offset = (page_number - 1) * page_size
+                with span("storage.page"):
+                    window = storage.page(
+                        offset,
+                        page_size,
+                        sort_by=None if sort_by == "Entry order" else sort_by,
+                        ascending=not descending,
+                        columns=grid_columns or None,
+                    )
+                st.dataframe(window, hide_index=True)
+                st.caption(f"Rows {min(offset + 1, total_rows):,}–{offset + len(window):,} of {total_rows:,}")
+            except Exception as e:
+                st.error(f"Error loading data: {e}")
 
-            # Check if 'Equipment' column exists
-            if "Equipment" not in data.columns:
-                st.error("The 'Equipment' column is missing. Please check the data file.")
-            else:
-                # Combine all equipment into a single list
-                all_equipment = [equipment for area in equipment_lists.values() for equipment in area]
+            # Combine all equipment into a single list (plus any recorded tags outside the registry)
+            all_equipment = [equipment for area in equipment_lists.values() for equipment in area]
+            all_equipment += sorted(set(recorded["Equipment"].astype(str)) - set(all_equipment))
 
+            if not all_equipment:
+                st.error("No equipment found. Please check the threshold configuration.")
+            else:
                 # Dropdown for Equipment Selection
-                equipment_options = data["Equipment"].unique()
-                selected_equipment = st.selectbox("Select Equipment", options=equipment_options)
+                selected_equipment = st.selectbox("Select Equipment", options=all_equipment)
 
                 # Date Range Inputs
                 start_date = st.date_input("Start Date", value=datetime(2023, 1, 1))
@@ -869,8 +879,8 @@ elif st.session_state.page == "monitoring":
                 if start_date > end_date:
                     st.error("Start date cannot be later than end date.")
                 else:
-                    # Filter Data
-                    filtered_data = filter_data(data, selected_equipment, start_date, end_date)
+                    # ✅ Only the selected equipment and date range are read from storage
+                    filtered_data = query_readings(selected_equipment, start_date, end_date)
 
                     if filtered_data.empty:
                         st.warning(f"No data found for {selected_equipment} between {start_date} and {end_date}.")
@@ -890,179 +900,42 @@ elif st.session_state.page == "monitoring":
                         
                         # Select appropriate dataset based on user choice
                         if data_option == "General Table (All Data)":
-                            visualization_data = data  # Use the full dataset
+                            trend_scope = (None, None, None)  # Use the full dataset
                             st.write("Using data from the general table (all records).")
                         else:
-                            visualization_data = filtered_data  # Use the filtered dataset
+                            trend_scope = (selected_equipment, start_date, end_date)  # Use the filtered dataset
                             st.write("Using data from the filtered table.")
                         
-                        # ✅ Retrieve max limits from thresholds
-                        if selected_equipment in equipment_thresholds:
-                            thresholds = equipment_thresholds[selected_equipment]
-                        else:
-                            thresholds = {}  # Default to empty if no thresholds available
-                        
-                        # Driving and Driven End Temperature Trend
-                        if "Driving End Temp" in visualization_data.columns and "Driven End Temp" in visualization_data.columns:
-                            st.write("#### Driving and Driven End Temperature Trend for Equipment")
-                            temp_chart_data = visualization_data[["Date", "Driving End Temp", "Driven End Temp"]].melt(
-                                id_vars="Date",
-                                var_name="Temperature Type",
-                                value_name="Temperature"
-                            )
-                            fig = px.line(
-                                temp_chart_data,
-                                x="Date",
-                                y="Temperature",
-                                color="Temperature Type",
-                                title="Driving and Driven End Temperature Trend",
-                                labels={"Temperature": "Temperature (°C)"}
-                            )
-                        
-                            # ✅ Add max limit lines if available
-                            if "Driving End Temp" in thresholds:
-                                fig.add_hline(y=thresholds["Driving End Temp"]["max"], line_dash="dash", line_color="red",
-                                              annotation_text="Max Driving Temp")
-                            if "Driven End Temp" in thresholds:
-                                fig.add_hline(y=thresholds["Driven End Temp"]["max"], line_dash="dash", line_color="blue",
-                                              annotation_text="Max Driven Temp")
-                        
-                            st.plotly_chart(fig)
-                        else:
-                            st.warning("Temperature data (Driving End or Driven End) is missing in the selected dataset.")
-                        
-                        # Equipment DE Vibration Trend
-                        if all(col in visualization_data.columns for col in ["DE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "DE Axial RMS (mm/s)"]):
-                            st.write("#### Vibration Trend for Equipment DE")
-                            vibration_chart_data = visualization_data[
-                                ["Date", "DE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "DE Axial RMS (mm/s)"]
-                            ].melt(id_vars="Date", var_name="Vibration Type", value_name="Value")
-                        
-                            fig = px.line(
-                                vibration_chart_data,
-                                x="Date",
-                                y="Value",
-                                color="Vibration Type",
-                                title="Vibration Trend for Equipment DE",
-                                labels={"Value": "Vibration RMS (mm/s)"}
-                            )
-                        
-                            # ✅ Add max limit lines if available
-                            for vib_type in ["DE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "DE Axial RMS (mm/s)"]:
-                                if vib_type in thresholds:
-                                    fig.add_hline(y=thresholds[vib_type]["max"], line_dash="dash", line_color="red",
-                                                  annotation_text=f"Max {vib_type}")
-                        
-                            st.plotly_chart(fig)
-                        else:
-                            st.warning("DE Vibration data is missing in the selected dataset.")
-                        
-                        # Equipment NDE Vibration Trend
-                        if all(col in visualization_data.columns for col in ["NDE Horizontal RMS (mm/s)", "NDE Vertical RMS (mm/s)", "NDE Axial RMS (mm/s)"]):
-                            st.write("#### Vibration Trend for Equipment NDE")
-                            vibration_chart_data = visualization_data[
-                                ["Date", "NDE Horizontal RMS (mm/s)", "NDE Vertical RMS (mm/s)", "NDE Axial RMS (mm/s)"]
-                            ].melt(id_vars="Date", var_name="Vibration Type", value_name="Value")
-                        
-                            fig = px.line(
-                                vibration_chart_data,
-                                x="Date",
-                                y="Value",
-                                color="Vibration Type",
-                                title="Vibration Trend for Equipment NDE",
-                                labels={"Value": "Vibration RMS (mm/s)"}
-                            )
-                        
-                            # ✅ Add max limit lines if available
-                            for vib_type in ["NDE Horizontal RMS (mm/s)", "NDE Vertical RMS (mm/s)", "NDE Axial RMS (mm/s)"]:
-                                if vib_type in thresholds:
-                                    fig.add_hline(y=thresholds[vib_type]["max"], line_dash="dash", line_color="red",
-                                                  annotation_text=f"Max {vib_type}")
-                        
-                            st.plotly_chart(fig)
-                        else:
-                            st.warning("NDE Vibration data is missing in the selected dataset.")
-                        
-                        # Motor Driving and Motor Driven End Temperature Trend
-                        if "Motor Driving End Temp" in visualization_data.columns and "Motor Driven End Temp" in visualization_data.columns:
-                            st.write("#### Motor Driving and Motor Driven End Temperature Trend for Equipment")
-                            temp_chart_data = visualization_data[["Date", "Motor Driving End Temp", "Motor Driven End Temp"]].melt(
-                                id_vars="Date",
-                                var_name="Temperature Type",
-                                value_name="Temperature"
-                            )
-                            fig = px.line(
-                                temp_chart_data,
-                                x="Date",
-                                y="Temperature",
-                                color="Temperature Type",
-                                title="Motor Driving and Motor Driven End Temperature Trend",
-                                labels={"Temperature": "Temperature (°C)"}
-                            )
-                        
-                            # ✅ Add max limit lines if available
-                            if "Motor Driving End Temp" in thresholds:
-                                fig.add_hline(y=thresholds["Motor Driving End Temp"]["max"], line_dash="dash", line_color="red",
-                                              annotation_text="Max Motor Driving Temp")
-                            if "Motor Driven End Temp" in thresholds:
-                                fig.add_hline(y=thresholds["Motor Driven End Temp"]["max"], line_dash="dash", line_color="blue",
-                                              annotation_text="Max Motor Driven Temp")
-                        
-                            st.plotly_chart(fig)
-                        else:
-                            st.warning("Motor Temperature data is missing in the selected dataset.")
-                        
-                        # Motor DE Vibration Trend
-                        if all(col in visualization_data.columns for col in ["Motor DE Horizontal RMS (mm/s)", "Motor DE Vertical RMS (mm/s)", "Motor DE Axial RMS (mm/s)"]):
-                            st.write("#### Vibration Trend for Motor DE")
-                            vibration_chart_data = visualization_data[
-                                ["Date", "Motor DE Horizontal RMS (mm/s)", "Motor DE Vertical RMS (mm/s)", "Motor DE Axial RMS (mm/s)"]
-                            ].melt(id_vars="Date", var_name="Vibration Type", value_name="Value")
-                        
-                            fig = px.line(
-                                vibration_chart_data,
-                                x="Date",
-                                y="Value",
-                                color="Vibration Type",
-                                title="Vibration Trend for Motor DE",
-                                labels={"Value": "Vibration RMS (mm/s)"}
-                            )
-                        
-                            # ✅ Add max limit lines if available
-                            for vib_type in ["Motor DE Horizontal RMS (mm/s)", "Motor DE Vertical RMS (mm/s)", "Motor DE Axial RMS (mm/s)"]:
-                                if vib_type in thresholds:
-                                    fig.add_hline(y=thresholds[vib_type]["max"], line_dash="dash", line_color="red",
-                                                  annotation_text=f"Max {vib_type}")
-                        
-                            st.plotly_chart(fig)
-                        else:
-                            st.warning("Motor DE Vibration data is missing in the selected dataset.")
-                        
-                        # Motor NDE Vibration Trend
-                        if all(col in visualization_data.columns for col in ["Motor NDE Horizontal RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor NDE Axial RMS (mm/s)"]):
-                            st.write("#### Vibration Trend for Motor NDE")
-                            vibration_chart_data = visualization_data[
-                                ["Date", "Motor NDE Horizontal RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor NDE Axial RMS (mm/s)"]
-                            ].melt(id_vars="Date", var_name="Vibration Type", value_name="Value")
-                        
-                            fig = px.line(
-                                vibration_chart_data,
-                                x="Date",
-                                y="Value",
-                                color="Vibration Type",
-                                title="Vibration Trend for Motor NDE",
-                                labels={"Value": "Vibration RMS (mm/s)"}
-                            )
-                        
-                            # ✅ Add max limit lines if available
-                            for vib_type in ["Motor NDE Horizontal RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor NDE Axial RMS (mm/s)"]:
-                                if vib_type in thresholds:
-                                    fig.add_hline(y=thresholds[vib_type]["max"], line_dash="dash", line_color="red",
-                                                  annotation_text=f"Max {vib_type}")
-                        
-                            st.plotly_chart(fig)
-                        else:
-                            st.warning("Motor NDE Vibration data is missing in the selected dataset.")
+                        # ✅ All trend charts come from one query and one long-form frame, with max limit lines from thresholds
+                        for group, fig in load_trend_figures(trend_scope, selected_equipment):
+                            if fig is not None:
+                                st.write(f"#### {group.heading}")
+                                show_chart(fig)
+                            else:
+                                st.warning(group.missing)
 # Add Back Button
 if st.button("Back to Home"):
     st.session_state.page = "main"
+
+# ✅ Close this rerun's timings and write them out if configured
+perf_run = TIMINGS.finish_run()
+if perf_run is not None:
+    try:
+        if PERF_LOG_PATH:
+            append_jsonl(PERF_LOG_PATH, perf_run)
+        if PERF_METRICS_PATH:
+            TIMINGS.write_prometheus(PERF_METRICS_PATH)
+    except OSError:
+        pass  # Timings are diagnostics; never fail the page over them
+
+if st.session_state.get("is_admin"):
+    with st.sidebar.expander("⏱️ Performance"):
+        if perf_run is None:
+            st.caption("Timing is off. Set `PERF_TIMINGS = true` in the secrets to turn it on.")
+        else:
+            st.metric("This rerun", f"{perf_run.seconds * 1000:,.0f} ms")
+            st.dataframe(perf_run.frame(), hide_index=True)
+            st.write("Rolling statistics")
+            st.dataframe(TIMINGS.stats(), hide_index=True)
+            st.write("Sheets API calls")
+            st.dataframe(TIMINGS.counters(), hide_index=True)
@@ -0,0 +1 @@
+"""Condition-monitoring analytics used by the OBOB Streamlit app (no Streamlit imports)."""
@@ -0,0 +1,236 @@
+"""Background deviation scanning into a precomputed alert store.
+
+DeviationScanner reads the readings appended to a storage backend since its last scan
+(in entry order, with storage.page), checks the running ones against the threshold table
+and writes one alert per reading and metric out of range to an AlertStore: an SQLite
+table indexed on (Equipment, Date) and on Date. The store remembers how many readings
+have been scanned and a fingerprint of the thresholds; when the thresholds change, or
+the storage has fewer readings than were scanned, every reading is scanned again.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from monitoring.thresholds import METRICS, violation_matrix
+
+ALERT_COLUMNS = ["Date", "Area", "Equipment", "Metric", "Value", "Min", "Max", "Reading"]
+
+# Columns of a reading needed to evaluate it
+SOURCE_COLUMNS = ["Date", "Area", "Equipment", "Is Running"] + METRICS
+
+
+def thresholds_fingerprint(table):
+    """Return a digest of the tags and limits of a ThresholdTable."""
+    digest = hashlib.sha1()
+    digest.update("\n".join(table.tags + table.metrics).encode("utf-8"))
+    digest.update(np.ascontiguousarray(table.lo).tobytes())
+    digest.update(np.ascontiguousarray(table.hi).tobytes())
+    return digest.hexdigest()
+
+
+def find_alerts(data, table, first_reading=0, evaluator=None):
+    """Return one row per (running reading, metric) outside its thresholds.
+
+    Reading is the entry position of the reading in storage (first_reading for the first
+    row of data). Missing measurements on equipment with thresholds are alerts with no Value.
+    An Evaluator (see monitoring.parallel) spreads the threshold checks over its workers.
+    """
+    positions = np.arange(first_reading, first_reading + len(data))
+    running = data["Is Running"].to_numpy(dtype=bool)
+    data, positions = data[running], positions[running]
+    violations = (evaluator.violations(data) if evaluator else violation_matrix(data, table)).to_numpy()
+    rows, cols = np.nonzero(violations)
+
+    lo, hi = table.limit_arrays(data["Equipment"], METRICS)
+    values = data[METRICS].to_numpy(dtype=float)
+    return pd.DataFrame({
+        "Date": data["Date"].to_numpy()[rows],
+        "Area": data["Area"].astype(str).to_numpy()[rows],
+        "Equipment": data["Equipment"].astype(str).to_numpy()[rows],
+        "Metric": np.asarray(METRICS, dtype=object)[cols],
+        "Value": values[rows, cols].round(4),  # Readings are stored as float32
+        "Min": lo[rows, cols],
+        "Max": hi[rows, cols],
+        "Reading": positions[rows],
+    })
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class AlertStore:
+    """Alerts in an SQLite file, indexed on (Equipment, Date) and Date."""
+
+    def __init__(self, path):
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS alerts ("Date" TEXT, "Area" TEXT, "Equipment" TEXT, "Metric" TEXT, '
+                '"Value" REAL, "Min" REAL, "Max" REAL, "Reading" INTEGER)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS alerts_equipment_date ON alerts ("Equipment", "Date")')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS alerts_date ON alerts ("Date")')
+            self._conn.execute("CREATE TABLE IF NOT EXISTS scan_state (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _state(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM scan_state WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def _set_state(self, key, value):
+        self._conn.execute(
+            "INSERT INTO scan_state (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, str(value)),
+        )
+
+    @property
+    def scanned(self):
+        """Number of readings (in entry order) already scanned."""
+        with self._lock:
+            return int(self._state("scanned", 0))
+
+    @property
+    def fingerprint(self):
+        """Thresholds fingerprint the alerts were computed with."""
+        with self._lock:
+            return self._state("thresholds")
+
+    @property
+    def version(self):
+        """Changes whenever alerts are added or reset (usable as a cache key)."""
+        with self._lock:
+            return (self._state("thresholds"), int(self._state("scanned", 0)))
+
+    def reset(self, fingerprint):
+        """Drop all alerts, to scan every reading again with new thresholds."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM alerts")
+            self._set_state("scanned", 0)
+            self._set_state("thresholds", fingerprint)
+
+    def add(self, alerts, scanned):
+        """Store alerts and the new number of scanned readings in one transaction."""
+        frame = alerts[ALERT_COLUMNS].astype(object)
+        frame["Date"] = pd.to_datetime(alerts["Date"]).dt.strftime("%Y-%m-%d")
+        rows = frame.where(frame.notna(), None).values.tolist()
+        columns = ", ".join(_quote(col) for col in ALERT_COLUMNS)
+        placeholders = ", ".join("?" for _ in ALERT_COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT INTO alerts ({columns}) VALUES ({placeholders})", rows)
+            self._set_state("scanned", scanned)
+
+    @staticmethod
+    def _where(equipment=None, start=None, end=None):
+        clauses, params = [], []
+        if equipment is not None:
+            clauses.append('"Equipment" = ?')
+            params.append(equipment)
+        if start is not None:
+            clauses.append('"Date" >= ?')
+            params.append(pd.Timestamp(start).strftime("%Y-%m-%d"))
+        if end is not None:
+            clauses.append('"Date" <= ?')
+            params.append(pd.Timestamp(end).strftime("%Y-%m-%d"))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, equipment=None, start=None, end=None, limit=None):
+        """Return alerts for one equipment tag and/or an inclusive date range, newest first."""
+        where, params = self._where(equipment, start, end)
+        sql = f'SELECT {", ".join(_quote(col) for col in ALERT_COLUMNS)} FROM alerts{where} ORDER BY "Date" DESC, rowid DESC'
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            alerts = pd.read_sql_query(sql, self._conn, params=params)
+        alerts["Date"] = pd.to_datetime(alerts["Date"])
+        return alerts
+
+    def summary(self, start=None, end=None):
+        """Return the number of alerts, latest date and largest value per (Equipment, Metric) in a date range."""
+        where, params = self._where(start=start, end=end)
+        sql = (
+            'SELECT "Equipment", "Metric", COUNT(*) AS "Alerts", MAX("Date") AS "Last Date", MAX("Value") AS "Max Value" '
+            f'FROM alerts{where} GROUP BY "Equipment", "Metric" ORDER BY "Alerts" DESC, "Equipment", "Metric"'
+        )
+        with self._lock:
+            summary = pd.read_sql_query(sql, self._conn, params=params)
+        summary["Last Date"] = pd.to_datetime(summary["Last Date"])
+        return summary
+
+
+class DeviationScanner:
+    """Evaluates readings appended to a storage backend and records their alerts."""
+
+    def __init__(self, storage, table, store, batch_rows=5000, evaluator=None):
+        self.storage = storage
+        self.table = table
+        self.store = store
+        self.batch_rows = batch_rows
+        self.evaluator = evaluator
+        self.last_error = None
+        self.last_scanned_at = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def scan(self):
+        """Scan the readings added since the last scan. Returns the number of new alerts."""
+        with self._lock:
+            try:
+                added = self._scan()
+            except Exception as e:
+                self.last_error = e
+                raise
+            self.last_error = None
+            self.last_scanned_at = time.time()
+            return added
+
+    def _scan(self):
+        fingerprint = thresholds_fingerprint(self.table)
+        total = self.storage.count()
+        scanned = self.store.scanned
+        if self.store.fingerprint != fingerprint or total < scanned:
+            # New thresholds, or the storage was rebuilt with fewer rows: start over
+            self.store.reset(fingerprint)
+            scanned = 0
+
+        added = 0
+        while scanned < total:
+            batch = self.storage.page(scanned, self.batch_rows, columns=SOURCE_COLUMNS)
+            if batch.empty:
+                break
+            alerts = find_alerts(batch, self.table, first_reading=scanned, evaluator=self.evaluator)
+            scanned += len(batch)
+            self.store.add(alerts, scanned)
+            added += len(alerts)
+        return added
+
+    # --- Background scan ---------------------------------------------------
+
+    def start(self, interval):
+        """Scan every `interval` seconds in a daemon thread (errors are kept in last_error)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="deviation-scanner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception:
+                pass  # Kept in last_error; alerts scanned so far stay available
+            self._stop.wait(interval)
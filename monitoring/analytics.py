@@ -0,0 +1,59 @@
+"""Dashboard computations as pure functions over frames.
+
+The KPIs and KPI chart series are computed from the daily rollup (monitoring.rollup),
+the weekly report from typed readings (monitoring.schema). Nothing here depends on
+Streamlit or on a storage backend, so the same functions serve the app, batch jobs and
+benchmarks.
+"""
+import pandas as pd
+
+from monitoring.rollup import rollup_by
+from monitoring.thresholds import deviation_rows, recommendations_by_row, violation_matrix
+from monitoring.timing import span
+
+# Rollup columns averaged into the "Average Temperature" KPI
+AVG_TEMP_COLUMNS = ["Driving End Temp mean", "Driven End Temp mean"]
+
+
+def kpis(daily):
+    """Return {"avg_temp": °C, "running_percentage": %} over a daily rollup, or None if it is empty."""
+    if daily.empty:
+        return None
+    totals = rollup_by(daily, []).iloc[0]
+    return {
+        "avg_temp": float(totals[AVG_TEMP_COLUMNS].mean()),
+        "running_percentage": float(totals["Running"] / totals["Readings"] * 100),
+    }
+
+
+def running_percentage_by_area(daily):
+    """Return the percentage of running readings per area."""
+    by_area = rollup_by(daily, ["Area"])
+    return pd.DataFrame({
+        "Area": by_area["Area"],
+        "Running Percentage (%)": by_area["Running"] / by_area["Readings"] * 100,
+    })
+
+
+def kpi_series(daily):
+    """Return (average temperature per date, running readings per date and area)."""
+    avg_temp_trend = rollup_by(daily, ["Date"]).rename(columns={"Avg Temp mean": "Avg Temp"})
+    running_equipment_by_area = rollup_by(daily, ["Date", "Area"]).rename(columns={"Running": "Is Running"})
+    return avg_temp_trend, running_equipment_by_area
+
+
+def weekly_deviations(data, table, evaluator=None):
+    """Check the running readings of data against a ThresholdTable.
+
+    Returns (number of running readings, deviating rows, their violation flags, their
+    recommendations as one list of messages per deviating row). An Evaluator (see
+    monitoring.parallel) checks the readings per equipment over its workers instead.
+    """
+    with span("deviation_scan"):
+        if evaluator:
+            return evaluator.weekly_report(data)
+        running = data[data["Is Running"].to_numpy(dtype=bool)]
+        violations = violation_matrix(running, table)
+        deviation_data = deviation_rows(running, violations)
+        recommendations = recommendations_by_row(running, violations, table)
+    return len(running), deviation_data, violations.loc[deviation_data.index], recommendations
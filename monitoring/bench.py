@@ -0,0 +1,243 @@
+"""Benchmarks of the data path at growing Sheet2 sizes.
+
+    python -m monitoring.bench --sizes 1000 10000 100000 1000000 --output bench.json
+
+For every size, synthetic readings (monitoring.synthetic) are served by an in-memory
+stand-in for the Sheet2 worksheet, or written to an SQLite file with --backend sqlite,
+and these stages are timed:
+
+- load: sync the local copy from the worksheet and read every reading (Sheets; this
+  includes formatting the stand-in's cell values), or read every reading from the
+  database (SQLite);
+- coerce: type the raw Sheet2 cell values, in the batches the sync fetches;
+- deviation_scan: threshold violations, deviating rows and recommendations of the
+  running readings (the weekly report);
+- kpi_aggregation: daily rollup, fleet totals and running share per area and date;
+- equipment_filter: a 90-day query of every equipment tag;
+- chart_preparation: downsampled trend frame and figures of every trend metric of one tag.
+
+Each stage runs --repeat times; the JSON report has the median and every run in seconds,
+so results of different commits can be compared. The workload is set by --years (one per
+100k rows by default), --machines and --metrics (the first n tags and metrics of the
+threshold table; all by default). With --workers N, the deviation scan
+runs on a parallel Evaluator (monitoring.parallel) with N worker processes.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from monitoring import rollup
+from monitoring.analytics import kpi_series, kpis, running_percentage_by_area, weekly_deviations
+from monitoring.charts import TREND_METRICS, trend_figures, trend_frame
+from monitoring.parallel import Evaluator
+from monitoring.schema import SHEET_COLUMNS, coerce
+from monitoring.storage import GoogleSheetsStorage, SQLiteStorage
+from monitoring.sync import SheetMirror
+from monitoring.synthetic import generate, sheet_rows
+from monitoring.thresholds import load_thresholds
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+STAGES = ["load", "coerce", "deviation_scan", "kpi_aggregation", "equipment_filter", "chart_preparation"]
+
+# Rows formatted at a time by the worksheet stand-in, and rows per coerce batch (as in a sync)
+BATCH_ROWS = 5000
+
+FILTER_DAYS = 90
+
+
+class MemoryWorksheet:
+    """Stand-in for the Sheet2 worksheet, serving synthetic readings as cell values.
+
+    Cell values are formatted per request, so the raw copy of a large sheet is never
+    held in memory at once.
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def row_values(self, row):
+        if row == 1:
+            return list(SHEET_COLUMNS)
+        return self.get(f"{row}:{row}")[0] if row - 1 <= len(self.data) else []
+
+    def get(self, cell_range):
+        first, last = (int(part) for part in cell_range.split(":"))
+        return sheet_rows(self.data.iloc[first - 2:last - 1])
+
+
+def _time(function, repeat):
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def _open_storage(backend, data, directory):
+    if backend == "sqlite":
+        storage = SQLiteStorage(os.path.join(directory, "bench.sqlite3"))
+        for first in range(0, len(data), BATCH_ROWS):
+            storage.append_frame(data.iloc[first:first + BATCH_ROWS])
+        return storage
+    worksheet = MemoryWorksheet(data)
+    mirror = SheetMirror(lambda: worksheet, os.path.join(directory, "sheet2"), batch_rows=BATCH_ROWS)
+    mirror.sync()
+    return GoogleSheetsStorage(lambda: worksheet, mirror)
+
+
+def _load(backend, data, directory):
+    """Return a callable that reads every reading from a cold backend."""
+    if backend == "sqlite":
+        storage = _open_storage(backend, data, directory)
+        return storage.read_all
+
+    worksheet = MemoryWorksheet(data)
+    runs = itertools.count()
+
+    def load():
+        mirror = SheetMirror(lambda: worksheet, os.path.join(directory, f"load-{next(runs)}"), batch_rows=BATCH_ROWS)
+        mirror.sync()
+        GoogleSheetsStorage(lambda: worksheet, mirror).read_all()
+
+    return load
+
+
+def _coerce_runs(data, repeat):
+    """Time coerce over every batch of raw cell values, excluding their formatting."""
+    batches = range(0, len(data), BATCH_ROWS)
+    totals = [0.0] * repeat
+    for first in batches:
+        raw = pd.DataFrame(sheet_rows(data.iloc[first:first + BATCH_ROWS]), columns=SHEET_COLUMNS)
+        for k, seconds in enumerate(_time(lambda: coerce(raw), repeat)):
+            totals[k] += seconds
+    return totals
+
+
+def benchmark_size(rows, table, backend="sheets", repeat=3, years=None, seed=0, evaluator=None, machines=None,
+                   metrics=None):
+    """Time every stage on `rows` synthetic readings; returns {stage: [seconds per run]}.
+
+    years defaults to one per 100k rows; machines and metrics limit the workload to the
+    first n tags and metrics of the table (see synthetic.generate).
+    """
+    years = years or max(1, rows // 100000)
+    tags = table.tags[:machines] if machines else table.tags
+    data = generate(table, rows, years=years, machines=machines, metrics=table.metrics[:metrics] if metrics else None,
+                    seed=seed)
+    directory = tempfile.mkdtemp(prefix="obob-bench-")
+    try:
+        results = {"load": _time(_load(backend, data, directory), repeat)}
+        results["coerce"] = _coerce_runs(data, repeat)
+
+        storage = _open_storage(backend, data, os.path.join(directory, "query"))
+        typed = storage.read_all()
+
+        def deviation_scan():
+            weekly_deviations(typed, table, evaluator)
+
+        def kpi_aggregation():
+            daily = rollup.summarize(typed)
+            kpis(daily)
+            running_percentage_by_area(daily)
+            kpi_series(daily)
+
+        end = typed["Date"].max()
+        start = end - pd.Timedelta(days=FILTER_DAYS)
+
+        def equipment_filter():
+            for tag in tags:
+                storage.query(tag, start, end)
+
+        tag = table.tags[0]
+
+        def chart_preparation():
+            readings = storage.query(tag, columns=["Date", "Equipment", *TREND_METRICS])
+            trend_figures(trend_frame(readings, TREND_METRICS, table), table.limits(tag))
+
+        results["deviation_scan"] = _time(deviation_scan, repeat)
+        results["kpi_aggregation"] = _time(kpi_aggregation, repeat)
+        results["equipment_filter"] = _time(equipment_filter, repeat)
+        results["chart_preparation"] = _time(chart_preparation, repeat)
+        return results
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def run(sizes=DEFAULT_SIZES, backend="sheets", repeat=3, seed=0, progress=None, workers=1, years=None,
+        machines=None, metrics=None):
+    """Benchmark every size; returns the JSON-serializable report."""
+    table = load_thresholds()
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "backend": backend,
+        "repeat": repeat,
+        "seed": seed,
+        "workers": workers,
+        "years": years,
+        "machines": machines or len(table.tags),
+        "metrics": metrics or len(table.metrics),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+        },
+        "results": [],
+    }
+    evaluator = Evaluator(table, workers) if workers > 1 else None
+    try:
+        for rows in sizes:
+            timings = benchmark_size(rows, table, backend, repeat, years, seed, evaluator, machines, metrics)
+            for stage in STAGES:
+                runs = timings[stage]
+                result = {"rows": rows, "stage": stage, "median_seconds": statistics.median(runs), "runs": runs}
+                report["results"].append(result)
+                if progress is not None:
+                    progress(result)
+    finally:
+        if evaluator is not None:
+            evaluator.close()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the OBOB data path on synthetic readings.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of readings")
+    parser.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (the median is reported)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--years", type=float, help="years of readings (default: one per 100k rows)")
+    parser.add_argument("--machines", type=int, help="equipment tags to spread readings over (default: all)")
+    parser.add_argument("--metrics", type=int, help="metrics measured per reading (default: all)")
+    parser.add_argument("--workers", type=int, default=1, help="processes for the deviation scan (default 1: serial)")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    def progress(result):
+        print(f"{result['rows']:>9,} rows  {result['stage']:<18} {result['median_seconds']:.3f} s", file=sys.stderr)
+
+    report = run(args.sizes, args.backend, args.repeat, args.seed, progress, args.workers, args.years, args.machines,
+                 args.metrics)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
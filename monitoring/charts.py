@@ -0,0 +1,272 @@
+"""Downsampling of trend series for charts.
+
+A chart is only so many pixels wide, so plotting more points than that per trace only
+costs serialization and rendering time. Each trace is cut down to at most `max_points`:
+
+- "lttb" (Largest-Triangle-Three-Buckets) keeps the visual shape of the series, and the
+  worst threshold excursion of every bucket is added back so that out-of-range readings
+  stay visible;
+- "minmax" keeps the lowest and highest reading of every bucket, which includes every
+  bucket's excursions by construction.
+
+The Reports tab trend charts are built from one long-form frame of all trend metrics
+(trend_frame), in which every metric group is a contiguous block of rows. The main page
+KPI charts are built from the series of monitoring.analytics.kpi_series.
+
+plotly is imported when a figure is first built, so code that only prepares series does
+not load it.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 1000
+
+# Share of the point budget of an LTTB trace reserved for threshold excursions
+EXCURSION_SHARE = 0.25
+
+
+def _bucket_ids(n, n_buckets):
+    """Assign n ordered points to n_buckets buckets of (almost) equal size."""
+    return (np.arange(n) * n_buckets) // n
+
+
+def lttb(x, y, n_out):
+    """Return the indices of the n_out points picked by Largest-Triangle-Three-Buckets.
+
+    x must be sorted; the first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # The point after the last bucket is the last point itself
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_x, next_y = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y, n_buckets):
+    """Return the indices of the lowest and highest point of each of n_buckets buckets."""
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    buckets = _bucket_ids(n, n_buckets)
+    order = np.lexsort((y, buckets))
+    starts = np.flatnonzero(np.r_[True, buckets[order][1:] != buckets[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def excursions(y, lo, hi, n_buckets):
+    """Return the index of the largest threshold excursion in each bucket that has one."""
+    with np.errstate(invalid="ignore"):
+        severity = np.fmax(np.nan_to_num(lo - y, nan=0.0), np.nan_to_num(y - hi, nan=0.0))
+    outside = np.flatnonzero(severity > 0)
+    if len(outside) == 0:
+        return outside
+    buckets = _bucket_ids(len(y), n_buckets)[outside]
+    order = np.lexsort((severity[outside], buckets))
+    last = np.r_[buckets[order][1:] != buckets[order][:-1], True]
+    return outside[order[last]]
+
+
+def downsample(x, y, max_points=DEFAULT_MAX_POINTS, lo=None, hi=None, method="lttb"):
+    """Return sorted indices of at most max_points points of (x, y) to plot.
+
+    lo/hi are threshold limits (scalars or arrays aligned to y, NaN for none) whose
+    excursions must stay visible. x must be sorted.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    if method == "minmax":
+        return minmax(y, max_points // 2)
+    if method != "lttb":
+        raise ValueError(f"Unknown downsampling method: {method!r}")
+
+    x = np.asarray(x).astype("int64") if np.asarray(x).dtype.kind == "M" else np.asarray(x, dtype=float)
+    x = (x - x[0]).astype(float)
+    if lo is None and hi is None:
+        return lttb(x, y, max_points)
+    n_excursion = max(1, int(max_points * EXCURSION_SHARE))
+    lo = np.broadcast_to(np.nan if lo is None else lo, y.shape).astype(float)
+    hi = np.broadcast_to(np.nan if hi is None else hi, y.shape).astype(float)
+    keep = np.concatenate([lttb(x, y, max_points - n_excursion), excursions(y, lo, hi, n_excursion)])
+    return np.unique(keep)
+
+
+def trend_frame(data, metrics, table=None, max_points=DEFAULT_MAX_POINTS, method="lttb",
+                var_name="Series", value_name="Value"):
+    """Return the long-form (Date, var_name, value_name) trend of metrics, downsampled per metric.
+
+    With a ThresholdTable, every reading is checked against the limits of its own equipment.
+    """
+    if table is not None and "Equipment" in data.columns:
+        lo_all, hi_all = table.limit_arrays(data["Equipment"], metrics)
+    else:
+        lo_all = hi_all = np.full((len(data), len(metrics)), np.nan)
+
+    dates = data["Date"].to_numpy(dtype="datetime64[ns]")
+    order = np.argsort(dates, kind="stable")
+    dates = dates[order]
+    traces = []
+    for j, metric in enumerate(metrics):
+        values = data[metric].to_numpy(dtype=float)[order]
+        valid = ~np.isnan(values) & ~np.isnat(dates)
+        x, y = dates[valid], values[valid]
+        keep = downsample(x, y, max_points, lo_all[order, j][valid], hi_all[order, j][valid], method)
+        traces.append(pd.DataFrame({"Date": x[keep], var_name: metric, value_name: y[keep]}))
+    if not traces:
+        return pd.DataFrame(columns=["Date", var_name, value_name])
+    return pd.concat(traces, ignore_index=True)
+
+
+class TrendGroup:
+    """A trend chart of a group of metrics, with max-limit lines from the threshold table."""
+
+    def __init__(self, heading, title, metrics, var_name, value_name, y_label, missing, limit_lines):
+        self.heading = heading
+        self.title = title
+        self.metrics = list(metrics)
+        self.var_name = var_name
+        self.value_name = value_name
+        self.y_label = y_label
+        self.missing = missing
+        self.limit_lines = list(limit_lines)  # (metric, line color, annotation)
+
+
+def _vibration_group(heading, metrics, missing):
+    return TrendGroup(
+        heading, heading, metrics, "Vibration Type", "Value", "Vibration RMS (mm/s)", missing,
+        [(metric, "red", f"Max {metric}") for metric in metrics],
+    )
+
+
+TREND_GROUPS = [
+    TrendGroup(
+        "Driving and Driven End Temperature Trend for Equipment", "Driving and Driven End Temperature Trend",
+        ["Driving End Temp", "Driven End Temp"], "Temperature Type", "Temperature", "Temperature (°C)",
+        "Temperature data (Driving End or Driven End) is missing in the selected dataset.",
+        [("Driving End Temp", "red", "Max Driving Temp"), ("Driven End Temp", "blue", "Max Driven Temp")],
+    ),
+    _vibration_group(
+        "Vibration Trend for Equipment DE",
+        ["DE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "DE Axial RMS (mm/s)"],
+        "DE Vibration data is missing in the selected dataset.",
+    ),
+    _vibration_group(
+        "Vibration Trend for Equipment NDE",
+        ["NDE Horizontal RMS (mm/s)", "NDE Vertical RMS (mm/s)", "NDE Axial RMS (mm/s)"],
+        "NDE Vibration data is missing in the selected dataset.",
+    ),
+    TrendGroup(
+        "Motor Driving and Motor Driven End Temperature Trend for Equipment",
+        "Motor Driving and Motor Driven End Temperature Trend",
+        ["Motor Driving End Temp", "Motor Driven End Temp"], "Temperature Type", "Temperature", "Temperature (°C)",
+        "Motor Temperature data is missing in the selected dataset.",
+        [("Motor Driving End Temp", "red", "Max Motor Driving Temp"), ("Motor Driven End Temp", "blue", "Max Motor Driven Temp")],
+    ),
+    _vibration_group(
+        "Vibration Trend for Motor DE",
+        ["Motor DE Horizontal RMS (mm/s)", "Motor DE Vertical RMS (mm/s)", "Motor DE Axial RMS (mm/s)"],
+        "Motor DE Vibration data is missing in the selected dataset.",
+    ),
+    _vibration_group(
+        "Vibration Trend for Motor NDE",
+        ["Motor NDE Horizontal RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor NDE Axial RMS (mm/s)"],
+        "Motor NDE Vibration data is missing in the selected dataset.",
+    ),
+]
+
+# All trend metrics, grouped, in chart order
+TREND_METRICS = [metric for group in TREND_GROUPS for metric in group.metrics]
+
+
+def trend_figure(trend, group, limits):
+    """Build the line chart of one group from its block of a trend_frame.
+
+    limits is {metric: {"min": ..., "max": ...}} (ThresholdTable.limits); max lines are drawn
+    for the metrics that have one.
+    """
+    import plotly.express as px
+
+    trend = trend.rename(columns={"Series": group.var_name, "Value": group.value_name})
+    fig = px.line(
+        trend,
+        x="Date",
+        y=group.value_name,
+        color=group.var_name,
+        title=group.title,
+        labels={group.value_name: group.y_label},
+    )
+    for metric, color, annotation in group.limit_lines:
+        if metric in limits:
+            fig.add_hline(y=limits[metric]["max"], line_dash="dash", line_color=color, annotation_text=annotation)
+    return fig
+
+
+def trend_figures(trends, limits, groups=TREND_GROUPS):
+    """Return [(group, figure or None if the group has no data)].
+
+    trends is one trend_frame of the metrics of all groups, in group order (TREND_METRICS).
+    """
+    metrics = trends["Series"].to_numpy()
+    figures = []
+    for group in groups:
+        # Groups are contiguous blocks of rows, so each one is a slice of the shared frame
+        rows = np.flatnonzero(np.isin(metrics, group.metrics))
+        if len(rows) == 0:
+            figures.append((group, None))
+        else:
+            figures.append((group, trend_figure(trends.iloc[rows[0]:rows[-1] + 1], group, limits)))
+    return figures
+
+
+def kpi_figures(avg_temp_trend, running_equipment_by_area):
+    """Build the average temperature trend and the running equipment count by area charts."""
+    import plotly.express as px
+
+    avg_temp = px.line(
+        avg_temp_trend,
+        x="Date",
+        y="Avg Temp",
+        title="Average Temperature Trend Over Time",
+        labels={"Avg Temp": "Average Temperature (°C)", "Date": "Date"},
+        markers=True,  # Adds markers for each data point
+    )
+    avg_temp.update_traces(line=dict(width=2))
+    avg_temp.update_layout(
+        title_font_size=18,
+        xaxis_title_font_size=14,
+        yaxis_title_font_size=14,
+        hovermode="x unified",  # Combine hover info
+    )
+
+    running = px.bar(
+        running_equipment_by_area,
+        x="Date",
+        y="Is Running",
+        color="Area",
+        title="Running Equipment Count by Area",
+        labels={"Is Running": "Running Equipment Count"},
+    )
+    running.update_layout(barmode="stack")
+    return avg_temp, running
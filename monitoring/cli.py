@@ -0,0 +1,179 @@
+"""Command-line weekly deviation report, without Streamlit.
+
+    python -m monitoring report --start 2024-05-01 --end 2024-05-07 --format CSV --output-dir reports
+
+Runs the same threshold evaluation and recommendations as the Weekly Report page over a
+date range (the last 7 days by default). Areas are evaluated in parallel, one task per
+area in a process pool; each task opens its own read-only storage and queries the tags
+of its area. The results are merged in area order (as configured in thresholds.json)
+into one report file plus a JSON summary next to it.
+
+Data comes from the local copy of Sheet2 (--store-dir, synced first with --sync and a
+service account file) or from the SQLite database (--backend sqlite). Both must already
+exist; the report opens them read-only and never creates an empty store.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import pandas as pd
+
+from monitoring.analytics import weekly_deviations
+from monitoring.export import FORMATS, export_report
+from monitoring.schema import concat
+from monitoring.storage import GoogleSheetsStorage, SQLiteStorage
+from monitoring.sync import STATE_FILE, SheetMirror
+from monitoring.thresholds import DEFAULT_CONFIG, load_thresholds
+
+
+def _read_only_worksheet():
+    raise RuntimeError("The report reads the local copy only; use --sync to update it first")
+
+
+def check_store(backend, location):
+    """Raise FileNotFoundError unless location holds an existing store, so a typo does not create an empty one."""
+    if backend == "sqlite":
+        if not os.path.isfile(location):
+            raise FileNotFoundError(f"No SQLite database at {location}")
+    elif not os.path.isfile(os.path.join(location, STATE_FILE)):
+        raise FileNotFoundError(f"No local copy of Sheet2 in {location} (run with --sync and --credentials first)")
+
+
+def open_storage(backend, location):
+    """Open an existing store for reading: "sheets" (local copy in a directory) or "sqlite" (a file)."""
+    check_store(backend, location)
+    if backend == "sqlite":
+        return SQLiteStorage(location, read_only=True)
+    return GoogleSheetsStorage(_read_only_worksheet, SheetMirror(_read_only_worksheet, location))
+
+
+def sync_local_copy(location, credentials_path):
+    """Pull the rows appended to Sheet2 into the local copy. Returns the number of new rows."""
+    from monitoring.sheets import open_worksheet
+
+    with open(credentials_path, encoding="utf-8") as f:
+        service_account_info = json.load(f)
+    return SheetMirror(lambda: open_worksheet(service_account_info), location).sync()
+
+
+def evaluate_area(backend, location, config, area, start, end):
+    """Evaluate one area: returns (area, readings, running, deviating rows, violations, recommendations, seconds)."""
+    started = time.perf_counter()
+    table = load_thresholds(config)
+    storage = open_storage(backend, location)
+    data = concat(storage.query(tag, start, end) for tag in table.areas[area])
+    running, deviation_data, violations, recommendations = weekly_deviations(data, table)
+    return area, len(data), running, deviation_data, violations, recommendations, time.perf_counter() - started
+
+
+def build_report(backend, location, start, end, areas=None, config=DEFAULT_CONFIG, workers=None):
+    """Evaluate areas in a process pool; returns (per-area results in config order, merged report parts)."""
+    table = load_thresholds(config)
+    areas = [area for area in table.areas if areas is None or area in areas]
+    if workers == 1 or len(areas) <= 1:
+        results = [evaluate_area(backend, location, config, area, start, end) for area in areas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(evaluate_area, backend, location, config, area, start, end) for area in areas]
+            results = [future.result() for future in futures]  # In submission (config) order
+
+    deviations = [result[3] for result in results]
+    deviation_data = pd.concat(deviations, ignore_index=True) if deviations else pd.DataFrame()
+    violations = pd.concat([result[4] for result in results], ignore_index=True) if results else pd.DataFrame()
+    recommendations = [messages for result in results for messages in result[5]]
+    return results, (deviation_data, violations, recommendations)
+
+
+def summarize(results, start, end, fmt, path, seconds):
+    """Return the JSON-serializable summary of a report."""
+    areas = []
+    for area, readings, running, deviation_data, violations, _, area_seconds in results:
+        areas.append({
+            "area": area,
+            "readings": readings,
+            "running": running,
+            "deviating": len(deviation_data),
+            "violations": {metric: int(count) for metric, count in violations.sum().items() if count},
+            "seconds": round(area_seconds, 3),
+        })
+    return {
+        "start": str(start),
+        "end": str(end),
+        "format": fmt,
+        "report": path,
+        "readings": sum(area["readings"] for area in areas),
+        "running": sum(area["running"] for area in areas),
+        "deviating": sum(area["deviating"] for area in areas),
+        "areas": areas,
+        "seconds": round(seconds, 3),
+    }
+
+
+def report(args):
+    started = time.perf_counter()
+    if args.sync:
+        if args.backend != "sheets" or not args.credentials:
+            raise SystemExit("--sync needs the sheets backend and --credentials")
+        print(f"Synced {sync_local_copy(args.store_dir, args.credentials):,} new rows", file=sys.stderr)
+
+    location = args.sqlite_path if args.backend == "sqlite" else args.store_dir
+    try:
+        check_store(args.backend, location)
+    except FileNotFoundError as e:
+        raise SystemExit(f"error: {e}")
+    results, (deviation_data, violations, recommendations) = build_report(
+        args.backend, location, args.start, args.end, args.areas, args.thresholds, args.workers
+    )
+
+    extension, _ = FORMATS[args.format]
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"weekly_report_{args.start}_{args.end}.{extension}")
+    out = export_report(deviation_data, violations, recommendations, args.format)
+    with out, open(path, "wb") as f:
+        shutil.copyfileobj(out, f)
+
+    summary = summarize(results, args.start, args.end, args.format, path, time.perf_counter() - started)
+    with open(os.path.join(args.output_dir, f"weekly_report_{args.start}_{args.end}.summary.json"), "w",
+              encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    for area in summary["areas"]:
+        print(f"Area {area['area']}: {area['running']:,} running readings, {area['deviating']:,} deviating")
+    print(f"Report: {path} ({summary['deviating']:,} deviating of {summary['running']:,} running readings, "
+          f"{summary['seconds']:.1f} s)")
+
+
+def _format_name(value):
+    names = {name.lower(): name for name in FORMATS}
+    if value.lower() not in names:
+        raise argparse.ArgumentTypeError(f"choose from {', '.join(FORMATS)}")
+    return names[value.lower()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m monitoring", description="OBOB condition-monitoring batch jobs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    weekly = commands.add_parser("report", help="write the weekly deviation report for a date range")
+    today = date.today()
+    weekly.add_argument("--start", type=date.fromisoformat, default=today - timedelta(days=7), help="YYYY-MM-DD")
+    weekly.add_argument("--end", type=date.fromisoformat, default=today, help="YYYY-MM-DD (inclusive)")
+    weekly.add_argument("--format", type=_format_name, default="CSV", help=f"{', '.join(FORMATS)} (default CSV)")
+    weekly.add_argument("--output-dir", default="reports")
+    weekly.add_argument("--areas", nargs="+", help="only these areas (default: all)")
+    weekly.add_argument("--workers", type=int, help="processes (default: one per CPU; 1 evaluates in this process)")
+    weekly.add_argument("--backend", choices=["sheets", "sqlite"], default="sheets")
+    weekly.add_argument("--store-dir", default="data/sheet2", help="local copy of Sheet2 (sheets backend)")
+    weekly.add_argument("--sqlite-path", default="data/obob.sqlite3", help="database file (sqlite backend)")
+    weekly.add_argument("--sync", action="store_true", help="pull new Sheet2 rows into the local copy first")
+    weekly.add_argument("--credentials", help="service account JSON file (for --sync)")
+    weekly.add_argument("--thresholds", default=DEFAULT_CONFIG, help="thresholds config")
+    weekly.set_defaults(run=report)
+
+    args = parser.parse_args(argv)
+    args.run(args)
@@ -0,0 +1,113 @@
+"""Export of the weekly deviation report as CSV, Parquet or Excel.
+
+The report has the deviating readings, one "<metric> violation" flag column per checked
+metric and a Recommendations column. It is built from an already computed scan (the
+deviating rows, their violation flags and their recommendations) and written to a spooled
+temporary file in chunks of rows, so no full copy of the report is held in memory at once.
+
+This bounds memory while writing only. A Streamlit download button reads the whole file
+into memory to send it, so the app caps the rows it offers for download (DOWNLOAD_MAX_ROWS).
+Larger reports are written straight to disk with `python -m monitoring report`.
+"""
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 5000
+
+# Reports larger than this are spooled to disk
+SPOOL_BYTES = 8 * 1024 * 1024
+
+# Format name: (file extension, MIME type)
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+VIOLATION_SUFFIX = " violation"
+
+
+def _plain(message):
+    """Drop Markdown emphasis from a recommendation message."""
+    return re.sub(r"\*\*(.+?)\*\*", r"\1", message)
+
+
+def report_chunks(deviations, violations, recommendations, chunk_rows=CHUNK_ROWS):
+    """Yield the report in frames of at most chunk_rows rows.
+
+    violations is the violation matrix of the deviating rows; recommendations has one
+    list of messages per deviating row.
+    """
+    flags = violations.to_numpy()
+    flag_columns = [metric + VIOLATION_SUFFIX for metric in violations.columns]
+    if len(deviations) == 0:
+        yield pd.DataFrame(columns=list(deviations.columns) + flag_columns + ["Recommendations"])
+        return
+    for first in range(0, len(deviations), chunk_rows):
+        last = first + chunk_rows
+        chunk = deviations.iloc[first:last].reset_index(drop=True)
+        chunk = pd.concat([chunk, pd.DataFrame(flags[first:last], columns=flag_columns)], axis=1)
+        chunk["Recommendations"] = [
+            "\n".join(_plain(message) for message in messages) for messages in recommendations[first:last]
+        ]
+        yield chunk
+
+
+def _write_csv(chunks, out):
+    for i, chunk in enumerate(chunks):
+        out.write(chunk.to_csv(index=False, header=i == 0, date_format="%Y-%m-%d").encode("utf-8"))
+
+
+def _write_parquet(chunks, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _excel_value(value):
+    if value is None or value is pd.NaT or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _write_excel(chunks, out):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Weekly Report")
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            sheet.append(list(chunk.columns))
+        for row in chunk.astype(object).itertuples(index=False, name=None):
+            sheet.append([_excel_value(value) for value in row])
+    workbook.save(out)
+
+
+WRITERS = {"CSV": _write_csv, "Parquet": _write_parquet, "Excel": _write_excel}
+
+
+def export_report(deviations, violations, recommendations, fmt, chunk_rows=CHUNK_ROWS):
+    """Write the report in format fmt (a FORMATS key); returns a file object positioned at the start."""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+    WRITERS[fmt](report_chunks(deviations, violations, recommendations, chunk_rows), out)
+    out.seek(0)
+    return out
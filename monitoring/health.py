@@ -0,0 +1,96 @@
+"""Fleet health scores from the latest reading of every equipment tag.
+
+The latest readings are laid out as an (equipment x metric) matrix aligned to the
+threshold table, and every value is normalized against its own limits in one array
+operation: the load is 0 at the min limit and 1 at the max limit, and grows past 1 the
+further a reading is outside its range, above or below. A metric's health is
+100 * (1 - load), clipped to 0..100, and an equipment's health score is that of its
+worst metric, since one failing bearing is enough to stop a machine.
+
+Equipment whose latest reading is not running, or that has no reading, gets no score.
+plotly is imported when the heatmap is first built.
+"""
+import numpy as np
+import pandas as pd
+
+# Columns of a reading needed to score it
+SOURCE_COLUMNS = ["Date", "Equipment", "Is Running"]
+
+
+def load(values, lo, hi):
+    """Return the share of the (lo, hi) range used by values, > 1 outside the range on either side."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        span = hi - lo
+        return np.where(values < lo, 1 + (lo - values) / span, (values - lo) / span)
+
+
+def metric_health(loads):
+    """Return the 0..100 health of every load (NaN where not measured or without limits)."""
+    return 100 * (1 - np.clip(loads, 0, 1))
+
+
+def latest_matrix(latest, table):
+    """Align a frame of latest readings (one per tag) to table.tags.
+
+    Returns (dates, running flags, values of shape (tags, metrics)); tags without a
+    reading have NaT, False and NaN.
+    """
+    latest = latest.drop_duplicates("Equipment", keep="last").set_index(
+        latest["Equipment"].astype(str).str.strip().to_numpy()
+    )
+    rows = latest.reindex(table.tags)
+    dates = rows["Date"].to_numpy(dtype="datetime64[ns]")
+    running = rows["Is Running"].fillna(False).to_numpy(dtype=bool)
+    values = rows[table.metrics].to_numpy(dtype=float)
+    return dates, running, values
+
+
+def fleet_health(latest, table):
+    """Return (metric health frame indexed by tag, ranking frame worst first).
+
+    latest has the most recent reading of each tag (storage.latest) with the
+    SOURCE_COLUMNS and table.metrics.
+    """
+    dates, running, values = latest_matrix(latest, table)
+    loads = load(values, table.lo, table.hi)
+    loads[~running] = np.nan
+    health = metric_health(loads)
+
+    # The worst metric of each tag is its largest load; it also orders tags past their limits
+    scored = ~np.isnan(loads).all(axis=1)
+    worst = np.argmax(np.where(np.isnan(loads), -np.inf, loads), axis=1)
+    rows = np.arange(len(loads))
+    worst_load = np.where(scored, loads[rows, worst], np.nan)
+
+    status = np.where(np.isnat(dates), "No readings", np.where(running, "Running", "Not running"))
+    area = np.array([area for area, tags in table.areas.items() for _ in tags], dtype=object)
+    ranking = pd.DataFrame({
+        "Equipment": table.tags,
+        "Area": area,
+        "Date": dates,
+        "Status": status,
+        "Health Score": metric_health(worst_load).round(1),
+        "Worst Metric": np.where(scored, np.asarray(table.metrics, dtype=object)[worst], None),
+        "Worst Value": np.where(scored, values[rows, worst], np.nan),
+    })
+    order = np.lexsort((rows, -np.nan_to_num(worst_load, nan=-np.inf)))
+    ranking = ranking.iloc[order].reset_index(drop=True)
+    ranking.insert(0, "Rank", pd.Series(np.arange(1, len(ranking) + 1), dtype="Int64").where(scored[order]))
+    return pd.DataFrame(health.round(1), index=table.tags, columns=table.metrics), ranking
+
+
+def health_figure(health):
+    """Build the (equipment x metric) heatmap of a metric health frame, red at 0 and green at 100."""
+    import plotly.express as px
+
+    fig = px.imshow(
+        health,
+        zmin=0,
+        zmax=100,
+        color_continuous_scale="RdYlGn",
+        aspect="auto",
+        labels={"x": "Metric", "y": "Equipment", "color": "Health"},
+        title="Health by Equipment and Metric (Latest Reading)",
+    )
+    fig.update_xaxes(tickangle=-45)
+    return fig
@@ -0,0 +1,171 @@
+"""Bulk import of readings from CSV or Excel files.
+
+Files are read in chunks of rows, so memory stays bounded whatever the file size. Every
+chunk is validated against the Sheet2 schema (monitoring.schema) and the equipment tags
+of the threshold table; valid rows are written with one batched storage.append_frame per
+chunk and rejected rows are collected in a per-row error report.
+"""
+import numpy as np
+import pandas as pd
+
+from monitoring.schema import SHEET_COLUMNS, MEASUREMENT_COLUMNS, TRUE_VALUES
+
+DEFAULT_CHUNK_ROWS = 5000
+
+# Columns a file must have; the others are optional (Area is taken from the tag)
+REQUIRED_COLUMNS = ["Date", "Equipment", "Is Running"]
+
+FALSE_VALUES = {"false", "0", "no"}
+
+# Keep at most this many row errors in a report (the count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportReport:
+    """Outcome of a bulk import."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.ignored_columns = []
+        self.errors = []  # (file row number, message), at most MAX_REPORTED_ERRORS
+        self.error = None  # Exception that stopped the import, if any
+
+    def add_errors(self, rows, messages):
+        self.rows_rejected += len(rows)
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        self.errors.extend(zip(rows[:room], messages[:room]))
+
+    def error_frame(self):
+        """Return the row errors as a DataFrame with Row and Error columns."""
+        return pd.DataFrame(self.errors, columns=["Row", "Error"])
+
+
+def _is_excel(filename):
+    return filename.lower().endswith((".xlsx", ".xlsm"))
+
+
+def _read_csv_chunks(file, chunk_rows):
+    reader = pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk_rows, skipinitialspace=True)
+    for chunk in reader:
+        chunk.index = chunk.index + 2  # File row numbers (row 1 is the header)
+        yield chunk
+
+
+def _read_excel_chunks(file, chunk_rows):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = ["" if name is None else str(name) for name in header]
+        batch, numbers = [], []
+        for number, row in enumerate(rows, start=2):
+            if all(value is None or value == "" for value in row):
+                continue
+            batch.append(row[: len(header)] + (None,) * (len(header) - len(row)))
+            numbers.append(number)
+            if len(batch) == chunk_rows:
+                yield pd.DataFrame(batch, columns=header, index=numbers)
+                batch, numbers = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=header, index=numbers)
+    finally:
+        workbook.close()
+
+
+def read_chunks(file, filename, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield the rows of a CSV or Excel file as DataFrames indexed by file row number."""
+    if _is_excel(filename):
+        chunks = _read_excel_chunks(file, chunk_rows)
+    else:
+        chunks = _read_csv_chunks(file, chunk_rows)
+    for chunk in chunks:
+        chunk.columns = [str(col).strip() for col in chunk.columns]
+        yield chunk
+
+
+def _text(values):
+    return values.fillna("").astype(str).str.strip()
+
+
+def validate_chunk(chunk, table):
+    """Validate raw rows against the schema and equipment tags.
+
+    Returns (valid rows as a frame for storage.append_frame, rejected row numbers, messages).
+    """
+    checks = []  # (mask of bad rows, message)
+
+    dates = pd.to_datetime(chunk["Date"], errors="coerce")
+    checks.append((dates.isna().to_numpy(), "invalid Date"))
+
+    equipment = _text(chunk["Equipment"])
+    codes = table.codes(equipment)
+    checks.append((codes < 0, "unknown Equipment tag"))
+
+    tag_areas = np.array([area for area, tags in table.areas.items() for _ in tags] + [""], dtype=object)
+    expected_area = tag_areas[codes]
+    if "Area" in chunk.columns:
+        area = _text(chunk["Area"]).to_numpy(dtype=object)
+        checks.append(((area != "") & (area != expected_area) & (codes >= 0), "Area does not match Equipment"))
+
+    running_text = _text(chunk["Is Running"]).str.lower().replace({"1.0": "1", "0.0": "0"})
+    checks.append((~running_text.isin(TRUE_VALUES | FALSE_VALUES).to_numpy(), "invalid Is Running"))
+
+    out = {
+        "Date": dates.dt.strftime("%Y-%m-%d"),
+        "Area": expected_area,
+        "Equipment": equipment,
+        "Is Running": running_text.isin(TRUE_VALUES),
+    }
+    for col in SHEET_COLUMNS:
+        if col in out or col not in chunk.columns:
+            continue
+        if col in MEASUREMENT_COLUMNS:
+            raw = chunk[col]
+            values = pd.to_numeric(raw, errors="coerce")
+            checks.append(((values.isna() & (_text(raw) != "")).to_numpy(), f"non-numeric {col}"))
+            out[col] = values.astype("float64")
+        else:
+            out[col] = _text(chunk[col])
+
+    bad = np.zeros(len(chunk), dtype=bool)
+    for mask, _ in checks:
+        bad |= mask
+    rows = np.flatnonzero(bad)
+    messages = ["; ".join(message for mask, message in checks if mask[i]) for i in rows]
+    valid = pd.DataFrame(out, index=chunk.index)[~bad]
+    return valid, chunk.index[rows].tolist(), messages
+
+
+def import_file(storage, file, filename, table, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """Validate and append the readings of a CSV or Excel file, one batch per chunk.
+
+    progress(report) is called after every chunk. A storage error stops the import and
+    is kept in report.error; rows of earlier chunks stay imported.
+    """
+    report = ImportReport(filename)
+    try:
+        for chunk in read_chunks(file, filename, chunk_rows):
+            if report.rows_read == 0:
+                missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+                if missing:
+                    raise ValueError(f"The file is missing columns: {', '.join(missing)}")
+                report.ignored_columns = [col for col in chunk.columns if col not in SHEET_COLUMNS]
+
+            valid, rejected, messages = validate_chunk(chunk, table)
+            report.rows_read += len(chunk)
+            report.add_errors(rejected, messages)
+            if not valid.empty:
+                storage.append_frame(valid)
+                report.rows_imported += len(valid)
+            if progress is not None:
+                progress(report)
+    except Exception as e:
+        report.error = e
+    return report
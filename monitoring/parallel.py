@@ -0,0 +1,242 @@
+"""Parallel evaluation of readings, partitioned by equipment or area.
+
+An Evaluator fans the threshold checks, the weekly report and rolling statistics of a
+frame of readings out over a pool of worker processes (or threads). The frame is reduced
+once to plain arrays (equipment codes, dates, running flags, measurements, low oil flags)
+that are placed in shared memory, so workers read them without a copy per task. The rows
+are sorted by partition (an equipment tag or an area), each task evaluates one partition,
+and results are merged by row position or tag, so they do not depend on which task
+finishes first and equal those of the serial functions.
+
+Frames smaller than min_rows are evaluated in the calling thread, where a pool would cost
+more than it saves.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from monitoring.rolling import RollingStats
+from monitoring.thresholds import METRICS, oil_low_matrix, recommendation_messages
+
+MIN_PARALLEL_ROWS = 20000
+
+PARTITIONS = ("equipment", "area")
+
+
+class SharedArrays:
+    """Copies of numpy arrays in shared memory blocks, unlinked on close."""
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}  # name: (block name, shape, dtype), to attach from other processes
+        self.arrays = {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self.blocks.append(block)
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+                view[...] = array
+                self.arrays[name] = view
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        self.arrays = {}  # Views must be released before their blocks are closed
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def _run_attached(task, spec, args):
+    """Run task(arrays, *args) in a worker process on arrays attached from shared memory."""
+    # Spawned workers share the parent's resource tracker, which already knows the blocks
+    blocks = [shared_memory.SharedMemory(name=block_name) for block_name, _, _ in spec.values()]
+    arrays = {
+        name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        for (name, (_, shape, dtype)), block in zip(spec.items(), blocks)
+    }
+    try:
+        return task(arrays, *args)
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+# --- Tasks (module level, so that worker processes can run them) ---------------
+
+
+def _check_task(arrays, lo, hi, start, stop):
+    """Write the violation flags of the rows order[start:stop]."""
+    rows = arrays["order"][start:stop]
+    codes = arrays["codes"][rows]
+    values = arrays["values"][rows]
+    with np.errstate(invalid="ignore"):
+        inside = (values >= lo[codes]) & (values <= hi[codes])
+    arrays["violations"][rows] = ~np.isnan(lo[codes]) & ~inside
+
+
+def _report_task(arrays, lo, hi, tags, metrics, start, stop):
+    """Check the rows order[start:stop]; return (deviating rows, their recommendation messages)."""
+    _check_task(arrays, lo, hi, start, stop)
+    rows = np.sort(arrays["order"][start:stop])
+    flags = arrays["violations"][rows]
+    flagged = flags.any(axis=1)
+    rows = rows[flagged]
+    codes = arrays["codes"][rows]
+    equipment = np.asarray(tags + [""], dtype=object)[codes]
+    messages = recommendation_messages(
+        equipment, flags[flagged], lo[codes], hi[codes], arrays["oil_low"][rows], metrics
+    )
+    return rows, messages
+
+
+def _rolling_task(arrays, table, window, alpha, tag_rows, state, start, stop):
+    """Add the readings order[start:stop] (in entry order) to the rolling state of tag_rows."""
+    stats = RollingStats(table, window, alpha)
+    stats.set_rows_state(tag_rows, state)
+    rows = np.sort(arrays["order"][start:stop])
+    codes, dates, values = arrays["codes"], arrays["dates"], arrays["values"]
+    for k in rows:
+        stats.update(table.tags[codes[k]], dates[k], values[k])
+    return stats.rows_state(tag_rows)
+
+
+# --- Scheduler -------------------------------------------------------------
+
+
+class Evaluator:
+    """Evaluates frames of readings against a ThresholdTable over a pool of workers."""
+
+    def __init__(self, table, workers=None, by="equipment", kind="process", min_rows=MIN_PARALLEL_ROWS):
+        if by not in PARTITIONS:
+            raise ValueError(f"Unknown partitioning: {by!r}")
+        if kind not in ("process", "thread"):
+            raise ValueError(f"Unknown pool kind: {kind!r}")
+        self.table = table
+        self.workers = workers or os.cpu_count() or 1
+        self.by = by
+        self.kind = kind
+        self.min_rows = min_rows
+        self._pool = None
+        self._lock = threading.Lock()
+        # Tag areas by table row, and limits with a trailing NaN row for unknown tags (code -1)
+        self._tag_areas = np.array([k for k, tags in enumerate(table.areas.values()) for _ in tags], dtype=np.int64)
+        nan_row = np.full((1, len(table.metrics)), np.nan)
+        self._lo = np.vstack([table.lo, nan_row])
+        self._hi = np.vstack([table.hi, nan_row])
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "thread":
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers)
+                else:
+                    # Spawned workers do not inherit the app's threads and locks
+                    context = multiprocessing.get_context("spawn")
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def close(self):
+        """Shut the worker pool down (it is started again when needed)."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def _limits(self, metrics):
+        cols = [self.table.metric_index[metric] for metric in metrics]
+        return self._lo[:, cols], self._hi[:, cols]
+
+    def _arrays(self, data, metrics):
+        """Reduce a frame to the arrays tasks read, with the rows sorted by partition."""
+        codes = np.asarray(self.table.codes(data["Equipment"]), dtype=np.int64)
+        keys = codes if self.by == "equipment" else np.where(codes >= 0, self._tag_areas[codes], -1)
+        order = np.argsort(keys, kind="stable")
+        # One (start, stop) range of order per partition, in table order; unknown tags (-1) are left out
+        sorted_keys = keys[order]
+        first = np.searchsorted(sorted_keys, 0)
+        ranges = []
+        if first < len(sorted_keys):  # At least one known tag
+            bounds = np.flatnonzero(np.r_[True, sorted_keys[first + 1:] != sorted_keys[first:-1], True]) + first
+            ranges = [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+        arrays = {
+            "order": order,
+            "codes": codes,
+            "values": data[metrics].to_numpy(dtype=float),
+            "violations": np.zeros((len(data), len(metrics)), dtype=bool),
+        }
+        return arrays, ranges, sorted_keys
+
+    def _run(self, task, arrays, task_args, outputs=()):
+        """Run task(arrays, *args) for every args; returns (results in task order, output arrays)."""
+        rows = len(arrays["codes"])
+        if self.workers == 1 or rows < self.min_rows or len(task_args) < 2:
+            return [task(arrays, *args) for args in task_args], arrays
+        pool = self._executor()
+        if self.kind == "thread":
+            futures = [pool.submit(task, arrays, *args) for args in task_args]
+            return [future.result() for future in futures], arrays
+        with SharedArrays(arrays) as shared:
+            futures = [pool.submit(_run_attached, task, shared.spec, args) for args in task_args]
+            results = [future.result() for future in futures]
+            return results, {name: shared.arrays[name].copy() for name in outputs}
+
+    def violations(self, data, metrics=METRICS):
+        """Return the violation frame of data, equal to thresholds.violation_matrix(data, table, metrics)."""
+        arrays, ranges, _ = self._arrays(data, metrics)
+        lo, hi = self._limits(metrics)
+        _, out = self._run(_check_task, arrays, [(lo, hi, start, stop) for start, stop in ranges], ["violations"])
+        return pd.DataFrame(out["violations"], index=data.index, columns=metrics)
+
+    def weekly_report(self, data, metrics=METRICS):
+        """Check the running readings of data; returns the same tuple as analytics.weekly_deviations."""
+        running = data[data["Is Running"].to_numpy(dtype=bool)]
+        arrays, ranges, _ = self._arrays(running, metrics)
+        arrays["oil_low"] = oil_low_matrix(running)
+        lo, hi = self._limits(metrics)
+        tags = list(self.table.tags)
+        results, out = self._run(
+            _report_task, arrays, [(lo, hi, tags, metrics, start, stop) for start, stop in ranges], ["violations"]
+        )
+        # Merge by row position: the report keeps the row order of data
+        rows = np.concatenate([rows for rows, _ in results]) if results else np.arange(0)
+        messages = [message for _, partition in results for message in partition]
+        order = np.argsort(rows, kind="stable")
+        rows = rows[order]
+        violations = pd.DataFrame(out["violations"], index=running.index, columns=metrics)
+        deviation_data = running.iloc[rows]
+        return len(running), deviation_data, violations.iloc[rows], [messages[k] for k in order]
+
+    def update_rolling(self, stats, data):
+        """Add the running readings of data to a RollingStats, equal to stats.update_frame(data)."""
+        running = data[data["Is Running"].to_numpy(dtype=bool)] if "Is Running" in data.columns else data
+        running = running[running["Date"].notna().to_numpy()]
+        if running.empty:
+            return
+        arrays, ranges, sorted_keys = self._arrays(running, self.table.metrics)
+        arrays["dates"] = running["Date"].to_numpy(dtype="datetime64[ns]")
+        task_args = []
+        for start, stop in ranges:
+            key = sorted_keys[start]
+            tag_rows = np.array([key]) if self.by == "equipment" else np.flatnonzero(self._tag_areas == key)
+            task_args.append((self.table, stats.window, stats.alpha, tag_rows, stats.rows_state(tag_rows), start, stop))
+        results, _ = self._run(_rolling_task, arrays, task_args)
+        for args, state in zip(task_args, results):
+            stats.set_rows_state(args[3], state)
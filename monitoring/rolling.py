@@ -0,0 +1,309 @@
+"""Rolling statistics per equipment and metric, for early warning of rising trends.
+
+For every (equipment tag, metric) RollingStats keeps the last `window` running readings
+and an exponentially weighted moving average (EWMA). A new reading updates one row of
+fixed-size arrays, so its cost does not depend on how much history there is. From the
+windows it derives the rolling mean, standard deviation and least-squares slope per day.
+
+Early warnings flag metrics that are still within their limits but rising fast, or
+whose trend reaches the max limit within a horizon. They are configured under
+"early_warning" in thresholds.json:
+
+    "early_warning": {
+      "window": 10,                 # readings per rolling window
+      "ewma_alpha": 0.3,            # weight of the newest reading in the EWMA
+      "min_readings": 4,            # readings needed in the window before flagging
+      "max_slope_per_day": {"temperature": 1.0, "vibration": 0.2},
+      "horizon_days": 14            # flag when the trend reaches the max limit this soon
+    }
+
+Readings count in the order they were entered, so a late entry for an earlier date
+takes its place in the window but not in the slope's time axis order (the regression
+does not need ordered dates).
+
+A TrendMonitor starts from the existing history with RollingStats.seed, which fills every
+window from its last `window` readings at once (the EWMA is started from those same
+readings), and then adds new readings one at a time.
+"""
+import json
+import threading
+import time
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from monitoring.thresholds import DEFAULT_CONFIG, RMS_SUFFIX
+
+DEFAULT_SETTINGS = {
+    "window": 10,
+    "ewma_alpha": 0.3,
+    "min_readings": 4,
+    "max_slope_per_day": {"temperature": 1.0, "vibration": 0.2},
+    "horizon_days": 14,
+}
+
+NANOSECONDS_PER_DAY = 86400 * 10**9
+
+
+@lru_cache(maxsize=None)
+def load_settings(path=DEFAULT_CONFIG):
+    """Load the early-warning settings from the thresholds config (defaults for missing keys)."""
+    with open(path, encoding="utf-8") as f:
+        configured = json.load(f).get("early_warning", {})
+    return {**DEFAULT_SETTINGS, **configured}
+
+
+def metric_kind(metric):
+    """Return "vibration" for RMS metrics and "temperature" otherwise."""
+    return "vibration" if metric.endswith(RMS_SUFFIX) else "temperature"
+
+
+class RollingStats:
+    """Windows of the last readings and EWMAs of every (tag, metric) of a ThresholdTable."""
+
+    def __init__(self, table, window=10, alpha=0.3):
+        self.table = table
+        self.window = window
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        """Forget every reading."""
+        shape = (len(self.table.tags), len(self.table.metrics))
+        window = self.window
+        # Oldest to newest along the last axis, NaN where the window is not full yet
+        self._days = np.full(shape + (window,), np.nan)
+        self._values = np.full(shape + (window,), np.nan)
+        self._ewma = np.full(shape, np.nan)
+        self._count = np.zeros(shape, dtype=np.int64)
+
+    def update(self, tag, date, values):
+        """Add one reading: values of table.metrics in order, NaN where not measured.
+
+        Returns False (and ignores the reading) if the tag is not in the table.
+        """
+        if tag not in self.table:
+            return False
+        i = self.table.tag_index.get_loc(tag)
+        values = np.asarray(values, dtype=float)
+        measured = ~np.isnan(values)
+        if not measured.any():
+            return True
+        day = pd.Timestamp(date).value / NANOSECONDS_PER_DAY
+
+        for buffer, new in ((self._days, day), (self._values, values[measured])):
+            rows = buffer[i, measured]
+            rows[:, :-1] = rows[:, 1:]
+            rows[:, -1] = new
+            buffer[i, measured] = rows
+
+        previous = self._ewma[i, measured]
+        new_values = values[measured]
+        self._ewma[i, measured] = np.where(
+            np.isnan(previous), new_values, self.alpha * new_values + (1 - self.alpha) * previous
+        )
+        self._count[i, measured] += 1
+        return True
+
+    def rows_state(self, rows):
+        """Return copies of the windows, EWMAs and counts of table rows (an index array)."""
+        return self._days[rows].copy(), self._values[rows].copy(), self._ewma[rows].copy(), self._count[rows].copy()
+
+    def set_rows_state(self, rows, state):
+        """Replace the windows, EWMAs and counts of table rows with a rows_state()."""
+        self._days[rows], self._values[rows], self._ewma[rows], self._count[rows] = state
+
+    def seed(self, data):
+        """Replace all state with the running readings of a typed frame (the history, in entry order).
+
+        Every window holds the last `window` measured readings of its (tag, metric), as
+        update_frame would leave it; the EWMA runs over those readings only, and counts
+        cover the whole frame.
+        """
+        self.reset()
+        if "Is Running" in data.columns:
+            data = data[data["Is Running"].to_numpy(dtype=bool)]
+        codes = np.asarray(self.table.codes(data["Equipment"]))
+        dates = data["Date"].to_numpy(dtype="datetime64[ns]")
+        keep = (codes >= 0) & ~np.isnat(dates)
+        if not keep.any():
+            return
+        order = np.argsort(codes[keep], kind="stable")  # By tag, in entry order within a tag
+        codes = codes[keep][order]
+        days = dates[keep][order].astype(np.int64) / NANOSECONDS_PER_DAY
+        values = data[self.table.metrics].to_numpy(dtype=float)[keep][order]
+
+        for j in range(len(self.table.metrics)):
+            measured = ~np.isnan(values[:, j])
+            tag_rows = codes[measured]
+            counts = np.bincount(tag_rows, minlength=len(self.table.tags))
+            # Position from the newest reading of each tag (0 = newest); the newest go right-aligned
+            from_newest = np.cumsum(counts)[tag_rows] - np.arange(len(tag_rows)) - 1
+            recent = from_newest < self.window
+            slots = self.window - 1 - from_newest[recent]
+            self._values[tag_rows[recent], j, slots] = values[measured, j][recent]
+            self._days[tag_rows[recent], j, slots] = days[measured][recent]
+            self._count[:, j] = counts
+
+        for slot in range(self.window):  # Oldest to newest; NaN slots leave the EWMA as is
+            new = self._values[..., slot]
+            self._ewma = np.where(
+                np.isnan(new), self._ewma,
+                np.where(np.isnan(self._ewma), new, self.alpha * new + (1 - self.alpha) * self._ewma),
+            )
+
+    def update_frame(self, data):
+        """Add the running readings of a typed frame, in row order."""
+        if "Is Running" in data.columns:
+            data = data[data["Is Running"].to_numpy(dtype=bool)]
+        if data.empty:
+            return
+        values = data[self.table.metrics].to_numpy(dtype=float)
+        dates = data["Date"].to_numpy()
+        tags = data["Equipment"].astype(str).to_numpy()
+        for k in range(len(data)):
+            if not pd.isna(dates[k]):
+                self.update(tags[k], dates[k], values[k])
+
+    def snapshot(self):
+        """Return the statistics of every (Equipment, Metric) with at least one reading."""
+        days, values = self._days, self._values
+        n = np.sum(~np.isnan(values), axis=2)
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # Mean of empty windows (NaN)
+            mean = np.nanmean(values, axis=2)
+            std = np.sqrt(np.nansum((values - mean[..., None]) ** 2, axis=2) / (n - 1))
+            # Least-squares slope of value over days, with days centred per series
+            centred = days - np.nanmean(days, axis=2)[..., None]
+            slope = np.nansum(centred * (values - mean[..., None]), axis=2) / np.nansum(centred ** 2, axis=2)
+        slope[~np.isfinite(slope)] = np.nan
+        std[n < 2] = np.nan
+
+        last = values[..., -1]
+        limit = self.table.hi
+        with np.errstate(invalid="ignore", divide="ignore"):
+            days_to_limit = np.where(slope > 0, (limit - self._ewma) / slope, np.nan)
+
+        tags, metrics = np.nonzero(self._count > 0)
+        return pd.DataFrame({
+            "Equipment": np.asarray(self.table.tags, dtype=object)[tags],
+            "Metric": np.asarray(self.table.metrics, dtype=object)[metrics],
+            "Readings": n[tags, metrics],
+            "Last": last[tags, metrics],
+            "Mean": mean[tags, metrics],
+            "Std": std[tags, metrics],
+            "EWMA": self._ewma[tags, metrics],
+            "Slope per Day": slope[tags, metrics],
+            "Max Limit": limit[tags, metrics],
+            "Days to Limit": days_to_limit[tags, metrics],
+        })
+
+
+def early_warnings(snapshot, settings):
+    """Return the snapshot rows within their max limit whose trend is rising too fast or nears the limit."""
+    max_slope = snapshot["Metric"].map(lambda metric: settings["max_slope_per_day"][metric_kind(metric)])
+    within = (snapshot["Last"] <= snapshot["Max Limit"]) | snapshot["Max Limit"].isna()
+    enough = snapshot["Readings"] >= settings["min_readings"]
+    rising_fast = snapshot["Slope per Day"] > max_slope
+    nearing = snapshot["Days to Limit"] <= settings["horizon_days"]
+    flagged = snapshot[within & enough & (rising_fast | nearing)].copy()
+
+    reasons = []
+    for row_rising, row_nearing, slope, days in zip(
+        rising_fast[flagged.index], nearing[flagged.index], flagged["Slope per Day"], flagged["Days to Limit"]
+    ):
+        reason = []
+        if row_rising:
+            reason.append(f"rising {slope:.2f}/day")
+        if row_nearing:
+            reason.append(f"reaches max limit in about {max(days, 0):.0f} days")
+        reasons.append(", ".join(reason))
+    flagged["Reason"] = reasons
+    return flagged.sort_values("Days to Limit", na_position="last").reset_index(drop=True)
+
+
+class TrendMonitor:
+    """Keeps RollingStats up to date with the readings appended to a storage backend."""
+
+    def __init__(self, storage, table, settings=None, batch_rows=5000, evaluator=None):
+        self.storage = storage
+        self.table = table
+        self.settings = dict(settings or DEFAULT_SETTINGS)
+        self.batch_rows = batch_rows
+        self.evaluator = evaluator  # Spreads the updates of each batch over its workers (monitoring.parallel)
+        self.position = 0  # Readings (in entry order) already added
+        self.last_error = None
+        self.last_updated_at = None  # None until the first update (the catch-up on the history) is done
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.stats = self._new_stats()
+
+    def _new_stats(self):
+        return RollingStats(self.table, self.settings["window"], self.settings["ewma_alpha"])
+
+    def update(self):
+        """Add the readings appended since the last update. Returns the number of readings read."""
+        with self._lock:
+            try:
+                added = self._update()
+            except Exception as e:
+                self.last_error = e
+                raise
+            self.last_error = None
+            self.last_updated_at = time.time()
+            return added
+
+    def _update(self):
+        total = self.storage.count()
+        if total < self.position:
+            # The storage was rebuilt with fewer rows: start over
+            self.stats = self._new_stats()
+            self.position = 0
+        added = 0
+        columns = ["Date", "Equipment", "Is Running"] + self.table.metrics
+        if self.position == 0 and total:
+            # Catching up on the whole history: fill the windows at once rather than reading by reading
+            history = self.storage.page(0, total, columns=columns)
+            self.stats.seed(history)
+            self.position = added = len(history)
+        while self.position < total:
+            batch = self.storage.page(self.position, self.batch_rows, columns=columns)
+            if batch.empty:
+                break
+            if self.evaluator:
+                self.evaluator.update_rolling(self.stats, batch)
+            else:
+                self.stats.update_frame(batch)
+            self.position += len(batch)
+            added += len(batch)
+        return added
+
+    # --- Background updates ------------------------------------------------
+
+    def start(self, interval):
+        """Update every `interval` seconds in a daemon thread, starting with the catch-up (errors are kept in last_error)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="trend-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.update()
+            except Exception:
+                pass  # Kept in last_error; the last statistics stay available
+            self._stop.wait(interval)
+
+    def warnings(self):
+        """Return the current early warnings (see early_warnings)."""
+        with self._lock:
+            snapshot = self.stats.snapshot()
+        return early_warnings(snapshot, self.settings)
@@ -0,0 +1,103 @@
+"""Daily rollup of readings per (Date, Area, Equipment).
+
+The rollup stores mergeable partial aggregates: the number of readings, how many of them
+were running, and the sum, non-missing count and maximum of every measurement. New
+readings are summarized on their own and merged into the existing rollup, so it can be
+kept up to date as rows are appended. Coarser views (per date, per area, totals) are
+derived from the partials without touching raw readings.
+
+Readings without a valid date are kept in undated partials (Date is NaT): they count in
+totals and per-area views, as they do over raw readings, but not in views per date.
+"""
+import numpy as np
+import pandas as pd
+
+from monitoring.schema import MEASUREMENT_COLUMNS
+
+ROLLUP_KEYS = ["Date", "Area", "Equipment"]
+
+# Mean of the driving and driven end temperatures of a reading
+AVG_TEMP = "Avg Temp"
+ROLLUP_METRICS = MEASUREMENT_COLUMNS + [AVG_TEMP]
+
+COUNT = "Readings"
+RUNNING = "Running"
+
+
+def sum_column(metric):
+    return f"{metric} sum"
+
+
+def count_column(metric):
+    return f"{metric} n"
+
+
+def max_column(metric):
+    return f"{metric} max"
+
+
+PARTIAL_COLUMNS = [COUNT, RUNNING] + [
+    col for metric in ROLLUP_METRICS for col in (sum_column(metric), count_column(metric), max_column(metric))
+]
+
+
+def empty():
+    """Return an empty rollup."""
+    return pd.DataFrame(columns=ROLLUP_KEYS + PARTIAL_COLUMNS)
+
+
+def summarize(data):
+    """Return partial aggregates of typed readings per (Date, Area, Equipment).
+
+    Readings without a valid date are summarized with Date NaT.
+    """
+    if data.empty:
+        return empty()
+    values = data[MEASUREMENT_COLUMNS].astype("float64")
+    values[AVG_TEMP] = values[["Driving End Temp", "Driven End Temp"]].mean(axis=1)
+    frame = pd.DataFrame({
+        "Date": data["Date"].dt.normalize(),
+        "Area": data["Area"].astype(str),
+        "Equipment": data["Equipment"].astype(str),
+        COUNT: 1,
+        RUNNING: data["Is Running"].astype("int64"),
+    })
+    for metric in ROLLUP_METRICS:
+        frame[sum_column(metric)] = values[metric].fillna(0.0)
+        frame[count_column(metric)] = values[metric].notna().astype("int64")
+        frame[max_column(metric)] = values[metric]
+    return _combine(frame, ROLLUP_KEYS)
+
+
+def _combine(frame, keys):
+    aggregations = {col: ("max" if col.endswith(" max") else "sum") for col in PARTIAL_COLUMNS}
+    if not keys:
+        return frame[PARTIAL_COLUMNS].agg(aggregations).to_frame().T
+    return frame.groupby(keys, as_index=False, sort=True, dropna=False).agg(aggregations)
+
+
+def merge(rollup, partials):
+    """Merge new partial aggregates into a rollup."""
+    frames = [frame for frame in (rollup, partials) if not frame.empty]
+    if not frames:
+        return empty()
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    return _combine(pd.concat(frames, ignore_index=True), ROLLUP_KEYS)
+
+
+def rollup_by(rollup, keys):
+    """Re-aggregate the rollup to coarser keys (e.g. ["Date"] or ["Area"]) and add means.
+
+    The result has the keys, Readings, Running, "<metric> mean" and "<metric> max" columns.
+    Undated partials are left out of views by Date.
+    """
+    if "Date" in keys:
+        rollup = rollup[rollup["Date"].notna()]
+    combined = _combine(rollup, list(keys))
+    result = combined[list(keys) + [COUNT, RUNNING]].copy()
+    for metric in ROLLUP_METRICS:
+        n = combined[count_column(metric)].astype("float64")
+        result[f"{metric} mean"] = combined[sum_column(metric)].astype("float64") / n.replace(0, np.nan)
+        result[f"{metric} max"] = combined[max_column(metric)].astype("float64")
+    return result
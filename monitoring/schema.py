@@ -0,0 +1,81 @@
+"""Schema of a condition-monitoring reading (one row of Sheet2).
+
+Rows are typed once, when they enter a local store; everything downstream receives
+frames with these dtypes and does not parse again.
+"""
+import numpy as np
+import pandas as pd
+
+# Column order for Sheet2 (one row per reading)
+SHEET_COLUMNS = [
+    "Date", "Area", "Equipment", "Is Running", "Driving End Temp", "Driven End Temp", "DE Oil Level", "NDE Oil Level",
+    "Abnormal Sound", "Leakage", "Observation", "DE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "DE Axial RMS (mm/s)",
+    "NDE Horizontal RMS (mm/s)", "NDE Vertical RMS (mm/s)", "NDE Axial RMS (mm/s)", "Motor Driving End Temp",
+    "Motor Driven End Temp", "Motor Abnormal Sound", "Motor DE Horizontal RMS (mm/s)", "Motor DE Vertical RMS (mm/s)",
+    "Motor DE Axial RMS (mm/s)", "Motor NDE Horizontal RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor NDE Axial RMS (mm/s)",
+]
+
+# Temperatures (°C) and vibration velocities (mm/s)
+MEASUREMENT_COLUMNS = [col for col in SHEET_COLUMNS if col.endswith("Temp") or col.endswith("(mm/s)")]
+
+# Text columns with a handful of distinct values
+CATEGORY_COLUMNS = [
+    "Area", "Equipment", "DE Oil Level", "NDE Oil Level", "Abnormal Sound", "Leakage", "Motor Abnormal Sound",
+]
+
+# Bumped whenever SCHEMA changes, so that local stores are rebuilt
+SCHEMA_VERSION = 2
+
+SCHEMA = {
+    "Date": "datetime64[ns]",
+    "Is Running": "bool",
+    **{col: "float32" for col in MEASUREMENT_COLUMNS},
+    **{col: "category" for col in CATEGORY_COLUMNS},
+    "Observation": "str",
+}
+
+TRUE_VALUES = {"true", "1", "yes"}
+
+
+def parse_bool(values):
+    """Parse sheet booleans ("TRUE", "true", 1, True, ...) into a bool Series."""
+    if values.dtype == bool:
+        return values
+    return values.astype(str).str.strip().str.lower().isin(TRUE_VALUES)
+
+
+def coerce(df, add_missing=False):
+    """Return df converted to SCHEMA; columns outside the schema become text.
+
+    With add_missing, Sheet2 columns absent from df are added as empty columns.
+    """
+    columns = list(df.columns)
+    if add_missing:
+        columns += [col for col in SHEET_COLUMNS if col not in df.columns]
+    out = {}
+    for col in columns:
+        values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        dtype = SCHEMA.get(col, "str")
+        if dtype == "datetime64[ns]":
+            out[col] = pd.to_datetime(values, errors="coerce").astype(dtype)
+        elif dtype == "bool":
+            out[col] = parse_bool(values)
+        elif dtype == "float32":
+            out[col] = pd.to_numeric(values, errors="coerce").astype(dtype)
+        elif dtype == "category":
+            out[col] = values.fillna("").astype(str).str.strip().astype(dtype)
+        else:
+            out[col] = values.fillna("").astype(str)
+    return pd.DataFrame(out, index=df.index)
+
+
+def concat(frames):
+    """Concatenate typed frames, keeping categorical columns categorical."""
+    frames = list(frames)
+    if not frames:
+        return coerce(pd.DataFrame(columns=SHEET_COLUMNS), add_missing=True)
+    for col in CATEGORY_COLUMNS:
+        if all(col in frame.columns and isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = pd.Index(sorted(set().union(*(frame[col].cat.categories for frame in frames))))
+            frames = [frame.assign(**{col: frame[col].cat.set_categories(categories)}) for frame in frames]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,47 @@
+"""Google Sheets access with a service account.
+
+gspread and the Google auth libraries are imported when a sheet is first opened, so
+code that only reads the local copy (or uses the SQLite backend) does not load them.
+"""
+import time
+
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive",  # Drive access avoids permission issues when opening by name
+]
+
+SPREADSHEET = "INDORAMA LLF"
+WORKSHEET = "Sheet2"
+
+
+def authorize(service_account_info):
+    """Return a gspread client authorized with a service account's info (a dict)."""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+    return gspread.authorize(creds)
+
+
+def open_worksheet(service_account_info, spreadsheet=SPREADSHEET, worksheet=WORKSHEET):
+    """Authorize and open a worksheet (Sheet2 of the plant spreadsheet by default)."""
+    return authorize(service_account_info).open(spreadsheet).worksheet(worksheet)
+
+
+class SheetConnection:
+    """Authorized worksheet handle, with the time it was last known to work."""
+
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+        self.checked_at = time.monotonic()
+
+    def is_healthy(self, interval):
+        """Re-check the connection at most every `interval` seconds; False means reconnect."""
+        if time.monotonic() - self.checked_at < interval:
+            return True
+        try:
+            self.worksheet.row_values(1)
+        except Exception:
+            return False
+        self.checked_at = time.monotonic()
+        return True
@@ -0,0 +1,453 @@
+"""Storage backends for condition-monitoring readings.
+
+Every backend stores rows with the Sheet2 columns (see monitoring.schema) and returns
+typed DataFrames:
+
+- GoogleSheetsStorage appends to Sheet2 and reads from its local SheetMirror, with a
+  sorted (Equipment, Date) index over the typed copy for equipment/date-range queries.
+- SQLiteStorage keeps everything in an embedded SQLite file with an (Equipment, Date)
+  index, for offline use and tests.
+
+Both keep the daily rollup (monitoring.rollup) up to date as rows are appended.
+"""
+import os
+import sqlite3
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from monitoring import rollup
+from monitoring.schema import SHEET_COLUMNS, MEASUREMENT_COLUMNS, coerce, parse_bool
+from monitoring.timing import span
+
+AGGREGATES = {"mean": "AVG", "sum": "SUM", "min": "MIN", "max": "MAX", "count": "COUNT"}
+
+
+class Storage:
+    """Interface of a store of readings."""
+
+    name = "storage"
+
+    def append(self, readings):
+        """Append readings (dicts keyed by column name), in order."""
+        self.append_frame(pd.DataFrame(list(readings)))
+
+    def append_frame(self, frame):
+        """Append the rows of a DataFrame with Sheet2 columns, in order (missing columns stay empty)."""
+        raise NotImplementedError
+
+    def query(self, equipment=None, start=None, end=None, columns=None):
+        """Return readings for one equipment tag and/or an inclusive date range."""
+        raise NotImplementedError
+
+    def aggregate(self, by, metrics, how="mean", equipment=None, start=None, end=None):
+        """Return `how` ("mean", "sum", "min", "max" or "count") of metrics grouped by columns."""
+        data = self.query(equipment, start, end, columns=list(by) + list(metrics))
+        return data.groupby(list(by), as_index=False, observed=True)[list(metrics)].agg(how)
+
+    def read_all(self):
+        """Return every reading."""
+        return self.query()
+
+    def count(self):
+        """Return the number of readings."""
+        return len(self.read_all())
+
+    def latest(self, columns=None):
+        """Return the most recent reading (by Date, then entry order) of every equipment tag, by tag."""
+        data = self.read_all()
+        data = data[data["Date"].notna()].sort_values(["Equipment", "Date"], kind="stable")
+        data = data.groupby("Equipment", observed=True, sort=False).tail(1)
+        return data if columns is None else data[list(columns)]
+
+    def page(self, offset, limit, sort_by=None, ascending=True, columns=None):
+        """Return `limit` readings starting at `offset`, in entry order or sorted by one column.
+
+        Missing values sort last in both directions.
+        """
+        data = self.read_all()
+        if sort_by is not None:
+            data = data.sort_values(sort_by, ascending=ascending, kind="stable", na_position="last")
+        elif not ascending:
+            data = data.iloc[::-1]
+        data = data.iloc[offset:offset + limit]
+        return data if columns is None else data[list(columns)]
+
+    def daily_rollup(self):
+        """Return the daily rollup per (Date, Area, Equipment), see monitoring.rollup."""
+        return rollup.summarize(self.read_all())
+
+    @property
+    def version(self):
+        """Changes whenever the stored data changes (usable as a cache key)."""
+        raise NotImplementedError
+
+    @property
+    def last_error(self):
+        """The last background error, if the backend syncs in the background."""
+        return None
+
+    def sync(self):
+        """Bring local state up to date with the backend (no-op by default)."""
+        return 0
+
+
+def _timestamp(value):
+    return pd.Timestamp(value).to_datetime64().astype("datetime64[ns]")
+
+
+class SortedIndex:
+    """Row positions of a frame sorted by (Equipment, Date) and by Date, for binary-search lookups."""
+
+    def __init__(self, data):
+        equipment = data["Equipment"]
+        if not isinstance(equipment.dtype, pd.CategoricalDtype):
+            equipment = equipment.astype(str).astype("category")
+        codes = equipment.cat.codes.to_numpy()
+        dates = data["Date"].to_numpy(dtype="datetime64[ns]")
+        self.size = len(data)
+        self.equipment_codes = {str(tag): code for code, tag in enumerate(equipment.cat.categories)}
+
+        # NaT sorts last, so missing dates never fall inside a date range
+        self.by_equipment = np.lexsort((dates, codes))
+        self.sorted_codes = codes[self.by_equipment]
+        self.equipment_dates = dates[self.by_equipment]
+        self.by_date = np.argsort(dates, kind="stable")
+        self.sorted_dates = dates[self.by_date]
+
+    @staticmethod
+    def _date_range(dates, start, end):
+        if start is None and end is None:
+            return 0, len(dates)
+        first = 0 if start is None else np.searchsorted(dates, _timestamp(start), side="left")
+        # Without an end, stop before the missing dates at the end
+        last_date = np.datetime64("NaT", "ns") if end is None else _timestamp(end)
+        last = np.searchsorted(dates, last_date, side="left" if end is None else "right")
+        return first, max(first, last)
+
+    def latest_positions(self):
+        """Return the position of the most recent dated row of every equipment, in tag order."""
+        if self.size == 0:
+            return np.arange(0)
+        # Last row of each equipment block, stepping back over missing dates (sorted last)
+        dated = ~np.isnat(self.equipment_dates)
+        codes = np.where(dated, self.sorted_codes, -2)
+        ends = np.flatnonzero(np.r_[codes[1:] != codes[:-1], True])
+        ends = ends[(codes[ends] >= 0)]
+        return self.by_equipment[ends]
+
+    def positions(self, equipment=None, start=None, end=None):
+        """Return the positions of matching rows, in row order."""
+        if equipment is None:
+            if start is None and end is None:
+                return np.arange(self.size)
+            first, last = self._date_range(self.sorted_dates, start, end)
+            return np.sort(self.by_date[first:last])
+
+        code = self.equipment_codes.get(equipment)
+        if code is None:
+            return np.arange(0)
+        lo = np.searchsorted(self.sorted_codes, code, side="left")
+        hi = np.searchsorted(self.sorted_codes, code, side="right")
+        first, last = self._date_range(self.equipment_dates[lo:hi], start, end)
+        return np.sort(self.by_equipment[lo + first:lo + last])
+
+
+class GoogleSheetsStorage(Storage):
+    """Sheet2 in Google Sheets. Writes are row appends; reads come from the local mirror."""
+
+    name = "Google Sheets"
+
+    def __init__(self, get_worksheet, mirror):
+        self.get_worksheet = get_worksheet
+        self.mirror = mirror
+        self._cache = (None, None, None)  # (version, frame, SortedIndex)
+        self._sort_orders = (None, {})  # (version, {(column, ascending): row positions})
+
+    def append_frame(self, frame):
+        if frame.empty:
+            return
+        worksheet = self.get_worksheet()
+        header = worksheet.row_values(1)
+        if not header:
+            # Empty sheet: write the header first
+            worksheet.append_row(SHEET_COLUMNS, value_input_option="RAW", table_range="A1")
+            header = SHEET_COLUMNS
+
+        missing = [col for col in SHEET_COLUMNS if col not in header]
+        if missing:
+            raise ValueError(f"Sheet2 header is missing columns: {', '.join(missing)}")
+
+        worksheet.append_rows(_sheet_rows(frame, header), value_input_option="RAW", table_range="A1")
+
+    def _read(self):
+        version = self.mirror.version
+        cached_version, frame, index = self._cache
+        if cached_version != version:
+            with span("storage.load"):
+                frame = self.mirror.read()
+                index = SortedIndex(frame)
+            self._cache = (version, frame, index)
+        return frame, index
+
+    @staticmethod
+    def _take(data, positions, columns):
+        if columns is None:
+            return data.iloc[positions]
+        indexer = data.columns.get_indexer(list(columns))
+        if (indexer < 0).any():
+            raise KeyError(f"Unknown columns: {[col for col, i in zip(columns, indexer) if i < 0]}")
+        return data.iloc[positions, indexer]
+
+    def query(self, equipment=None, start=None, end=None, columns=None):
+        data, index = self._read()
+        return self._take(data, index.positions(equipment, start, end), columns)
+
+    def count(self):
+        return len(self._read()[0])
+
+    def latest(self, columns=None):
+        data, index = self._read()
+        return self._take(data, index.latest_positions(), columns)
+
+    def _sort_order(self, data, sort_by, ascending):
+        """Row positions sorted by one column, computed once per version and direction."""
+        version = self.mirror.version
+        cached_version, orders = self._sort_orders
+        if cached_version != version:
+            orders = {}
+            self._sort_orders = (version, orders)
+        key = (sort_by, ascending)
+        if key not in orders:
+            values = data[sort_by].reset_index(drop=True)
+            orders[key] = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        return orders[key]
+
+    def page(self, offset, limit, sort_by=None, ascending=True, columns=None):
+        data, _ = self._read()
+        if sort_by is not None:
+            positions = self._sort_order(data, sort_by, ascending)[offset:offset + limit]
+        elif ascending:
+            positions = np.arange(offset, min(offset + limit, len(data)))
+        else:
+            positions = np.arange(len(data) - 1 - offset, max(len(data) - 1 - offset - limit, -1), -1)
+        return self._take(data, positions, columns)
+
+    def daily_rollup(self):
+        return self.mirror.read_rollup()
+
+    @property
+    def version(self):
+        return self.mirror.version
+
+    @property
+    def last_error(self):
+        return self.mirror.last_error
+
+    def sync(self):
+        return self.mirror.sync()
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_type(col):
+    if col == "Is Running":
+        return "INTEGER"
+    if col in MEASUREMENT_COLUMNS:
+        return "REAL"
+    return "TEXT"
+
+
+def _sql_rows(frame):
+    """Return the rows of frame as lists of SQLite values, in SHEET_COLUMNS order."""
+    out = {}
+    for col in SHEET_COLUMNS:
+        if col not in frame.columns:
+            out[col] = pd.Series(None, index=frame.index, dtype=object)
+        elif col == "Date":
+            out[col] = pd.to_datetime(frame[col], errors="coerce").dt.strftime("%Y-%m-%d")
+        elif col == "Is Running":
+            out[col] = parse_bool(frame[col]).astype("int64")
+        elif col in MEASUREMENT_COLUMNS:
+            out[col] = pd.to_numeric(frame[col], errors="coerce").astype("float64")
+        else:
+            out[col] = frame[col].astype(object).where(frame[col].notna(), None).map(str, na_action="ignore")
+    values = pd.DataFrame(out, index=frame.index).astype(object)
+    return values.where(values.notna(), None).values.tolist()
+
+
+def _sheet_value(value):
+    """Return a cell value the Sheets API can serialize: dates as YYYY-MM-DD, numpy scalars as Python values."""
+    if isinstance(value, (pd.Timestamp, date)):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, np.floating):
+        return float(str(value))  # Shortest decimal, so float32 readings are not widened (0.1, not 0.100000001)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _sheet_rows(frame, header):
+    """Return the rows of frame as lists of Sheet2 cell values, in header order (missing values empty)."""
+    values = frame.reindex(columns=header).astype(object)
+    values = values.where(values.notna(), "")
+    return [[_sheet_value(value) for value in row] for row in values.values.tolist()]
+
+
+def _rollup_sql_type(col):
+    if col.endswith(" sum") or col.endswith(" max"):
+        return "REAL"
+    return "INTEGER"
+
+
+def _sql_date(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+class SQLiteStorage(Storage):
+    """Readings in an embedded SQLite database, indexed on (Equipment, Date)."""
+
+    name = "local database"
+
+    def __init__(self, path, read_only=False):
+        self.path = path
+        self._lock = threading.Lock()
+        if read_only:
+            # An existing database, opened as is (no directories, tables or indexes are created)
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            return
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            columns = ", ".join(f"{_quote(col)} {_sql_type(col)}" for col in SHEET_COLUMNS)
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS readings ({columns})")
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS readings_equipment_date ON readings ("Equipment", "Date")'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS readings_date ON readings ("Date")')
+
+            keys = ", ".join(f"{_quote(col)} TEXT" for col in rollup.ROLLUP_KEYS)
+            partials = ", ".join(f"{_quote(col)} {_rollup_sql_type(col)}" for col in rollup.PARTIAL_COLUMNS)
+            primary_key = ", ".join(_quote(col) for col in rollup.ROLLUP_KEYS)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS daily_rollup ({keys}, {partials}, PRIMARY KEY ({primary_key}))"
+            )
+            needs_backfill = (
+                self._conn.execute("SELECT 1 FROM daily_rollup LIMIT 1").fetchone() is None
+                and self._conn.execute("SELECT 1 FROM readings LIMIT 1").fetchone() is not None
+            )
+        if needs_backfill:
+            # Database created before the rollup existed
+            partials = rollup.summarize(self.read_all())
+            with self._lock, self._conn:
+                self._upsert_rollup(partials)
+
+    def append_frame(self, frame):
+        if frame.empty:
+            return
+        columns = ", ".join(_quote(col) for col in SHEET_COLUMNS)
+        placeholders = ", ".join("?" for _ in SHEET_COLUMNS)
+        rows = _sql_rows(frame)
+        partials = rollup.summarize(coerce(frame, add_missing=True))
+        with self._lock, self._conn:
+            self._conn.executemany(f"INSERT INTO readings ({columns}) VALUES ({placeholders})", rows)
+            self._upsert_rollup(partials)
+
+    def _upsert_rollup(self, partials):
+        """Merge partial aggregates into the daily_rollup table (caller holds the lock and transaction)."""
+        if partials.empty:
+            return
+        columns = rollup.ROLLUP_KEYS + rollup.PARTIAL_COLUMNS
+        updates = []
+        for col in rollup.PARTIAL_COLUMNS:
+            q = _quote(col)
+            if col.endswith(" max"):
+                updates.append(f"{q} = CASE WHEN {q} IS NULL OR excluded.{q} > {q} THEN excluded.{q} ELSE {q} END")
+            else:
+                updates.append(f"{q} = {q} + excluded.{q}")
+        sql = (
+            f"INSERT INTO daily_rollup ({', '.join(_quote(col) for col in columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT ({', '.join(_quote(col) for col in rollup.ROLLUP_KEYS)}) DO UPDATE SET {', '.join(updates)}"
+        )
+        frame = partials[columns].astype(object)
+        # Undated partials get an empty Date rather than NULL, so that they merge on conflict too
+        frame["Date"] = partials["Date"].dt.strftime("%Y-%m-%d").fillna("")
+        rows = frame.where(frame.notna(), None).values.tolist()
+        self._conn.executemany(sql, rows)
+
+    @staticmethod
+    def _where(equipment, start, end):
+        clauses, params = [], []
+        if equipment is not None:
+            clauses.append('"Equipment" = ?')
+            params.append(equipment)
+        if start is not None:
+            clauses.append('"Date" >= ?')
+            params.append(_sql_date(start))
+        if end is not None:
+            clauses.append('"Date" <= ?')
+            params.append(_sql_date(end))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _select(self, sql, params):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def query(self, equipment=None, start=None, end=None, columns=None):
+        columns = list(columns) if columns is not None else SHEET_COLUMNS
+        where, params = self._where(equipment, start, end)
+        sql = f"SELECT {', '.join(_quote(col) for col in columns)} FROM readings{where} ORDER BY rowid"
+        return coerce(self._select(sql, params))
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+
+    def latest(self, columns=None):
+        columns = list(columns) if columns is not None else SHEET_COLUMNS
+        # The (Equipment, Date) index serves the per-equipment ordering
+        sql = (
+            f"SELECT {', '.join(_quote(col) for col in columns)} FROM readings WHERE rowid IN ("
+            'SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER (PARTITION BY "Equipment" '
+            'ORDER BY "Date" DESC, rowid DESC) AS rank FROM readings WHERE "Date" IS NOT NULL) WHERE rank = 1'
+            ') ORDER BY "Equipment"'
+        )
+        return coerce(self._select(sql, []))
+
+    def page(self, offset, limit, sort_by=None, ascending=True, columns=None):
+        columns = list(columns) if columns is not None else SHEET_COLUMNS
+        direction = "ASC" if ascending else "DESC"
+        if sort_by is None:
+            order = f"rowid {direction}"
+        else:
+            # NULLs last in both directions, ties in entry order
+            order = f"{_quote(sort_by)} IS NULL, {_quote(sort_by)} {direction}, rowid"
+        sql = f"SELECT {', '.join(_quote(col) for col in columns)} FROM readings ORDER BY {order} LIMIT ? OFFSET ?"
+        return coerce(self._select(sql, [int(limit), int(offset)]))
+
+    def aggregate(self, by, metrics, how="mean", equipment=None, start=None, end=None):
+        func = AGGREGATES[how]
+        keys = ", ".join(_quote(col) for col in by)
+        values = ", ".join(f"{func}({_quote(col)}) AS {_quote(col)}" for col in metrics)
+        where, params = self._where(equipment, start, end)
+        sql = f"SELECT {keys}, {values} FROM readings{where} GROUP BY {keys} ORDER BY {keys}"
+        result = self._select(sql, params)
+        result[list(by)] = coerce(result[list(by)])
+        return result
+
+    def daily_rollup(self):
+        partials = self._select('SELECT * FROM daily_rollup ORDER BY "Date", "Area", "Equipment"', [])
+        partials["Date"] = pd.to_datetime(partials["Date"].replace("", None))
+        return partials
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._conn.execute("SELECT MAX(rowid) FROM readings").fetchone()[0]
@@ -0,0 +1,227 @@
+"""Incremental mirror of Sheet2 in a local Parquet store.
+
+Sheet2 is append-only, so the mirror only has to remember how many data rows it has
+already copied. Each sync fetches the rows after that point in batches and writes them
+as a new Parquet part; parts are compacted into one file once there are too many.
+The daily rollup (monitoring.rollup) is updated from each batch and stored next to the parts.
+If the sheet header or the schema version changes, the mirror is rebuilt from scratch.
+"""
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from monitoring import rollup
+from monitoring.schema import SCHEMA_VERSION, coerce, concat
+from monitoring.timing import span
+
+STATE_FILE = "state.json"
+PARTS_DIR = "parts"
+
+
+class SheetMirror:
+    """Local, typed copy of a worksheet that is kept up to date with delta fetches."""
+
+    def __init__(self, open_worksheet, directory, batch_rows=5000, max_parts=32):
+        self.open_worksheet = open_worksheet
+        self.directory = directory
+        self.batch_rows = batch_rows
+        self.max_parts = max_parts
+        self.last_error = None
+        self.last_synced_at = None
+        self._worksheet = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._rollup_cache = (None, None)  # (file name, frame)
+        os.makedirs(os.path.join(directory, PARTS_DIR), exist_ok=True)
+        self.state = self._read_state()
+
+    # --- State -------------------------------------------------------------
+
+    def _read_state(self):
+        path = os.path.join(self.directory, STATE_FILE)
+        if not os.path.exists(path):
+            return self._empty_state([])
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _empty_state(header):
+        return {"schema": SCHEMA_VERSION, "header": header, "synced_rows": 0, "parts": [], "rollup": None}
+
+    def _write_state(self, state):
+        path = os.path.join(self.directory, STATE_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+        self.state = state
+
+    @property
+    def synced_rows(self):
+        return self.state["synced_rows"]
+
+    @property
+    def version(self):
+        """Changes whenever the stored data changes (usable as a cache key)."""
+        return (tuple(self.state["header"]), self.state["synced_rows"], tuple(self.state["parts"]))
+
+    # --- Sync --------------------------------------------------------------
+
+    def _worksheet_handle(self):
+        if self._worksheet is None:
+            self._worksheet = self.open_worksheet()
+        return self._worksheet
+
+    def _write_part(self, name, frame):
+        path = os.path.join(self.directory, PARTS_DIR, name)
+        tmp = path + ".tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+
+    def sync(self):
+        """Copy rows appended to the sheet since the last sync. Returns the number of new rows."""
+        with self._lock:
+            try:
+                added = self._sync()
+            except Exception as e:
+                self._worksheet = None  # Reconnect on the next attempt
+                self.last_error = e
+                raise
+            self.last_error = None
+            self.last_synced_at = time.time()
+            return added
+
+    def _sync(self):
+        worksheet = self._worksheet_handle()
+        header = worksheet.row_values(1)
+        state = dict(self.state)
+        if header != state["header"] or state.get("schema") != SCHEMA_VERSION:
+            # New or changed header or schema: start over
+            self._remove_parts(state["parts"] + [state.get("rollup")])
+            state = self._empty_state(header)
+            self._write_state(state)
+        if not header:
+            return 0
+        if "rollup" not in state:
+            # Store created before the rollup existed: build it from the synced rows
+            state = self._store_rollup(state, rollup.summarize(self.read()))
+        current_rollup = self.read_rollup()
+
+        added = 0
+        while True:
+            first = state["synced_rows"] + 2  # Row 1 is the header
+            last = first + self.batch_rows - 1
+            values = worksheet.get(f"{first}:{last}")
+            if not values:
+                break
+
+            width = len(header)
+            rows = [list(row[:width]) + [""] * (width - len(row)) for row in values if any(row)]
+            if rows:
+                name = f"part-{first:09d}.parquet"
+                with span("sync.coerce"):
+                    frame = coerce(pd.DataFrame(rows, columns=header), add_missing=True)
+                self._write_part(name, frame)
+                state = {**state, "parts": state["parts"] + [name]}
+                current_rollup = rollup.merge(current_rollup, rollup.summarize(frame))
+                added += len(rows)
+            state = {**state, "synced_rows": state["synced_rows"] + len(values)}
+            if rows:
+                state = self._store_rollup(state, current_rollup)
+            else:
+                self._write_state(state)
+            if len(values) < self.batch_rows:
+                break
+
+        if len(state["parts"]) > self.max_parts:
+            self._compact()
+        return added
+
+    def _compact(self):
+        """Merge all parts into one file."""
+        parts = self.state["parts"]
+        name = f"part-000000002-{self.state['synced_rows']:09d}.parquet"
+        self._write_part(name, self._read_parts(parts))
+        self._write_state({**self.state, "parts": [name]})
+        self._remove_parts(parts)
+
+    def _store_rollup(self, state, frame):
+        """Write the rollup for `state` and commit the state; returns the new state."""
+        previous = state.get("rollup")
+        name = f"rollup-{state['synced_rows']:09d}.parquet"
+        self._write_part(name, frame)
+        state = {**state, "rollup": name}
+        self._write_state(state)
+        self._rollup_cache = (name, frame)
+        if previous and previous != name:
+            self._remove_parts([previous])
+        return state
+
+    def _remove_parts(self, parts):
+        for name in parts:
+            if not name:
+                continue
+            path = os.path.join(self.directory, PARTS_DIR, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def resync(self):
+        """Drop the local copy and fetch the whole sheet again."""
+        with self._lock:
+            self._remove_parts(self.state["parts"] + [self.state.get("rollup")])
+            self._write_state(self._empty_state([]))
+        return self.sync()
+
+    # --- Read --------------------------------------------------------------
+
+    def _read_parts(self, parts):
+        return concat(pd.read_parquet(os.path.join(self.directory, PARTS_DIR, name)) for name in parts)
+
+    def read(self):
+        """Return every synced row, typed as in monitoring.schema."""
+        for attempt in range(3):
+            state = self.state
+            if not state["parts"]:
+                return coerce(pd.DataFrame(columns=state["header"]), add_missing=True)
+            try:
+                return self._read_parts(state["parts"])
+            except FileNotFoundError:
+                # Parts were compacted while reading; retry with the new state
+                if attempt == 2:
+                    raise
+
+    def read_rollup(self):
+        """Return the daily rollup of the synced rows (see monitoring.rollup)."""
+        name = self.state.get("rollup")
+        if not name:
+            return rollup.empty()
+        cached_name, frame = self._rollup_cache
+        if cached_name != name:
+            frame = pd.read_parquet(os.path.join(self.directory, PARTS_DIR, name))
+            self._rollup_cache = (name, frame)
+        return frame
+
+    # --- Background sync ---------------------------------------------------
+
+    def start(self, interval):
+        """Sync every `interval` seconds in a daemon thread (errors are kept in last_error)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="sheet-mirror", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                pass  # Kept in last_error; the local copy stays readable
+            self._stop.wait(interval)
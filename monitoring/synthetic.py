@@ -0,0 +1,82 @@
+"""Synthetic condition-monitoring readings for benchmarks and demos.
+
+Readings are spread over `years` of dates (in date order, like Sheet2) across the tags of
+a threshold table. Every (tag, metric) has its own baseline within the lower half of its
+range, a yearly swing and noise; a share of the running readings is pushed above the max
+limit so that deviation scans have excursions to find. Readings of equipment that is not
+running look like the entry form's: zero measurements and "N/A" checks.
+"""
+import numpy as np
+import pandas as pd
+
+from monitoring.schema import SHEET_COLUMNS
+
+TEXT_CHOICES = {
+    "DE Oil Level": ["Normal", "Low", "High"],
+    "NDE Oil Level": ["Normal", "Low", "High"],
+    "Abnormal Sound": ["No", "Yes"],
+    "Leakage": ["No", "Yes"],
+    "Motor Abnormal Sound": ["No", "Yes"],
+}
+
+# Odds of each choice above ("Normal"/"No" most of the time)
+TEXT_WEIGHTS = {3: [0.9, 0.07, 0.03], 2: [0.95, 0.05]}
+
+
+def generate(table, rows, years=1, machines=None, metrics=None, excursion_rate=0.01, running_rate=0.9,
+             start="2024-01-01", seed=0):
+    """Return a typed frame of `rows` readings with the Sheet2 columns.
+
+    machines limits the tags to the first n of the table; metrics limits the measured
+    metrics (the others are left empty); excursion_rate is the share of running
+    measurements above their max limit.
+    """
+    rng = np.random.default_rng(seed)
+    tags = table.tags[:machines] if machines else table.tags
+    metrics = list(metrics) if metrics is not None else table.metrics
+    columns = [table.metric_index[metric] for metric in metrics]
+
+    days = np.sort(rng.integers(0, int(years * 365), rows))
+    codes = rng.integers(0, len(tags), rows)
+    running = rng.random(rows) < running_rate
+    tag_rows = table.tag_index.get_indexer(tags)[codes]
+
+    lo = np.nan_to_num(table.lo[np.ix_(tag_rows, columns)], nan=0.0)
+    hi = table.hi[np.ix_(tag_rows, columns)]
+    hi = np.where(np.isnan(hi), lo + 1, hi)
+    span = hi - lo
+
+    baseline = rng.uniform(0.25, 0.55, (len(tags), len(metrics)))[codes]
+    phase = rng.uniform(0, 2 * np.pi, (len(tags), len(metrics)))[codes]
+    swing = 0.1 * np.sin(2 * np.pi * days[:, None] / 365 + phase)
+    noise = rng.normal(0, 0.05, (rows, len(metrics)))
+    values = lo + span * np.clip(baseline + swing + noise, 0, 0.95)
+
+    excursion = rng.random((rows, len(metrics))) < excursion_rate
+    values = np.where(excursion, hi + span * rng.uniform(0.05, 0.5, (rows, len(metrics))), values)
+    values = np.where(running[:, None], values.round(1), 0.0)
+
+    areas = {tag: area for area, area_tags in table.areas.items() for tag in area_tags}
+    data = {
+        "Date": pd.Timestamp(start) + pd.to_timedelta(days, unit="D"),
+        "Area": np.asarray([areas[tag] for tag in tags], dtype=object)[codes],
+        "Equipment": np.asarray(tags, dtype=object)[codes],
+        "Is Running": running,
+    }
+    for col, choices in TEXT_CHOICES.items():
+        picked = rng.choice(np.asarray(choices, dtype=object), rows, p=TEXT_WEIGHTS[len(choices)])
+        data[col] = np.where(running, picked, "N/A")
+    data["Observation"] = np.where(running, "", "Not Running")
+    for j, metric in enumerate(metrics):
+        data[metric] = values[:, j]
+
+    frame = pd.DataFrame(data)
+    return frame.reindex(columns=SHEET_COLUMNS)
+
+
+def sheet_rows(data):
+    """Return readings as Sheet2 cell values (lists of strings), as the Sheets API returns them."""
+    cells = data[SHEET_COLUMNS].copy()
+    cells["Date"] = cells["Date"].dt.strftime("%Y-%m-%d")
+    cells["Is Running"] = np.where(cells["Is Running"], "TRUE", "FALSE")
+    return cells.astype(object).where(cells.notna(), "").astype(str).values.tolist()
@@ -0,0 +1,208 @@
+"""Equipment threshold registry and vectorized evaluation of readings against it.
+
+Thresholds are configured in thresholds.json:
+
+    {
+      "version": 1,
+      "classes": {"PA": {"Driving End Temp": [0, 70], ...}, ...},
+      "areas": {"1670": ["1670-PA-02A", ...], ...},
+      "overrides": {"1670-PA-02A": {"Driving End Temp": [0, 80]}}
+    }
+
+Every tag takes the limits of its equipment class (the middle part of the tag, e.g. "PA"
+in "1670-PA-02A"), then any per-tag overrides.
+"""
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Metrics checked against equipment thresholds, in the order recommendations are reported
+METRICS = [
+    "Driving End Temp", "Driven End Temp", "Motor Driving End Temp", "Motor Driven End Temp",
+    "DE Horizontal RMS (mm/s)", "NDE Horizontal RMS (mm/s)", "DE Vertical RMS (mm/s)", "NDE Vertical RMS (mm/s)",
+    "DE Axial RMS (mm/s)", "NDE Axial RMS (mm/s)", "Motor DE Horizontal RMS (mm/s)", "Motor NDE Horizontal RMS (mm/s)",
+    "Motor DE Vertical RMS (mm/s)", "Motor NDE Vertical RMS (mm/s)", "Motor DE Axial RMS (mm/s)", "Motor NDE Axial RMS (mm/s)",
+]
+
+RMS_SUFFIX = " (mm/s)"
+
+CONFIG_VERSION = 1
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), "thresholds.json")
+
+
+def equipment_class(tag):
+    """Return the equipment class of a tag, e.g. "PA" for "1670-PA-02A"."""
+    parts = tag.split("-")
+    return parts[1] if len(parts) >= 3 else ""
+
+
+class ThresholdTable:
+    """Min/max limits stored as (tags x metrics) arrays, indexed by equipment tag and metric."""
+
+    def __init__(self, areas, lo, hi, metrics=METRICS, version=CONFIG_VERSION):
+        self.areas = {area: list(tags) for area, tags in areas.items()}
+        self.tags = [tag for tags in self.areas.values() for tag in tags]
+        self.metrics = list(metrics)
+        self.version = version
+        self.tag_index = pd.Index(self.tags)
+        self.metric_index = {metric: j for j, metric in enumerate(self.metrics)}
+
+        # A trailing all-NaN row is used for tags that are not in the table (indexer value -1)
+        nan_row = np.full((1, len(self.metrics)), np.nan)
+        self._lo = np.vstack([np.asarray(lo, dtype=float), nan_row])
+        self._hi = np.vstack([np.asarray(hi, dtype=float), nan_row])
+
+    @property
+    def lo(self):
+        return self._lo[:-1]
+
+    @property
+    def hi(self):
+        return self._hi[:-1]
+
+    def __contains__(self, tag):
+        return tag in self.tag_index
+
+    def __len__(self):
+        return len(self.tags)
+
+    def equipment_lists(self):
+        """Return {area: [tags]} for the equipment selectors."""
+        return {area: list(tags) for area, tags in self.areas.items()}
+
+    def codes(self, equipment):
+        """Return the row of each equipment tag in the table (-1 for unknown tags)."""
+        equipment = pd.Series(equipment)
+        if isinstance(equipment.dtype, pd.CategoricalDtype):
+            # Look up each category once; missing values (code -1) hit the trailing -1
+            lookup = np.append(self.tag_index.get_indexer(equipment.cat.categories.astype(str).str.strip()), -1)
+            return lookup[equipment.cat.codes.to_numpy()]
+        return self.tag_index.get_indexer(equipment.astype(str).str.strip())
+
+    def limit_arrays(self, equipment, metrics=None):
+        """Return (min, max) arrays of shape (rows, metrics) aligned to an Equipment column.
+
+        Rows whose equipment is not in the table get NaN limits.
+        """
+        codes = self.codes(equipment)
+        if metrics is None:
+            return self._lo[codes], self._hi[codes]
+        cols = [self.metric_index[metric] for metric in metrics]
+        return self._lo[np.ix_(codes, cols)], self._hi[np.ix_(codes, cols)]
+
+    def limits(self, tag):
+        """Return {metric: {"min": ..., "max": ...}} for one tag, or {} if it is unknown."""
+        if tag not in self:
+            return {}
+        i = self.tag_index.get_loc(tag)
+        return {
+            metric: {"min": float(self._lo[i, j]), "max": float(self._hi[i, j])}
+            for metric, j in self.metric_index.items()
+        }
+
+
+def build_table(config):
+    """Build a ThresholdTable from a parsed thresholds config."""
+    version = config.get("version")
+    if version != CONFIG_VERSION:
+        raise ValueError(f"Unsupported thresholds config version: {version!r} (expected {CONFIG_VERSION})")
+
+    classes = config["classes"]
+    overrides = config.get("overrides", {})
+    areas = config["areas"]
+    tags = [tag for area_tags in areas.values() for tag in area_tags]
+
+    lo = np.full((len(tags), len(METRICS)), np.nan)
+    hi = np.full((len(tags), len(METRICS)), np.nan)
+    for i, tag in enumerate(tags):
+        cls = equipment_class(tag)
+        if cls not in classes:
+            raise ValueError(f"No threshold class {cls!r} configured for {tag}")
+        limits = {**classes[cls], **overrides.get(tag, {})}
+        for j, metric in enumerate(METRICS):
+            if metric in limits:
+                lo[i, j], hi[i, j] = limits[metric]
+
+    unknown = [tag for tag in overrides if tag not in tags]
+    if unknown:
+        raise ValueError(f"Threshold overrides for unknown equipment: {', '.join(unknown)}")
+
+    return ThresholdTable(areas, lo, hi, version=version)
+
+
+@lru_cache(maxsize=None)
+def load_thresholds(path=DEFAULT_CONFIG):
+    """Load the threshold table from a config file (parsed once per process)."""
+    with open(path, encoding="utf-8") as f:
+        return build_table(json.load(f))
+
+
+def violation_matrix(data, table, metrics=METRICS):
+    """Return a boolean frame (rows x metrics) that is True where a reading is outside its range.
+
+    Missing readings on equipment with thresholds count as violations; equipment without
+    thresholds never violates.
+    """
+    lo, hi = table.limit_arrays(data["Equipment"], metrics)
+    values = data[metrics].to_numpy(dtype=float)
+    with np.errstate(invalid="ignore"):
+        inside = (values >= lo) & (values <= hi)
+    return pd.DataFrame(~np.isnan(lo) & ~inside, index=data.index, columns=metrics)
+
+
+def deviation_rows(data, violations):
+    """Return the rows of data with at least one violation."""
+    return data[violations.any(axis=1)]
+
+
+def _describe(metric):
+    """Return (icon, label, unit) used in recommendation messages."""
+    if metric.endswith(RMS_SUFFIX):
+        return "📊", metric[: -len(RMS_SUFFIX)], "mm/s"
+    return "🔧", metric, "°C"
+
+
+OIL_LEVEL_COLUMNS = ["DE Oil Level", "NDE Oil Level"]
+
+
+def oil_low_matrix(data):
+    """Return a boolean array (rows x OIL_LEVEL_COLUMNS) that is True where an oil level is "Low"."""
+    oil_low = np.zeros((len(data), len(OIL_LEVEL_COLUMNS)), dtype=bool)
+    for k, col in enumerate(OIL_LEVEL_COLUMNS):
+        if col in data.columns:
+            oil_low[:, k] = (data[col] == "Low").to_numpy()
+    return oil_low
+
+
+def recommendations_by_row(data, violations, table):
+    """Return the recommendation messages of each deviating row (one list per row), in row order."""
+    metrics = list(violations.columns)
+    flagged = violations.any(axis=1).to_numpy()
+    rows = data[flagged]
+    lo, hi = table.limit_arrays(rows["Equipment"], metrics)
+    equipment = rows["Equipment"].astype(str).str.strip().to_numpy()
+    return recommendation_messages(equipment, violations.to_numpy()[flagged], lo, hi, oil_low_matrix(rows), metrics)
+
+
+def recommendation_messages(equipment, matrix, lo, hi, oil_low, metrics):
+    """Build the messages of each row from its tag, violation flags, limits and low oil flags (arrays by row)."""
+    by_row = []
+    for i in range(len(equipment)):
+        messages = []
+        for j in np.flatnonzero(matrix[i]):
+            icon, label, unit = _describe(metrics[j])
+            messages.append(
+                f"{icon} **{equipment[i]}**: {label} is outside the range {lo[i, j]:g} - {hi[i, j]:g} {unit}."
+            )
+        for _ in range(oil_low[i].sum()):
+            messages.append(f"🛢️ **{equipment[i]}**: Oil level is low. Consider refilling.")
+        by_row.append(messages)
+    return by_row
+
+
+def build_recommendations(data, violations, table):
+    """Build recommendation messages for the deviating rows, in row order."""
+    return [message for messages in recommendations_by_row(data, violations, table) for message in messages]
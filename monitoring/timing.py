@@ -0,0 +1,259 @@
+"""Lightweight timing spans, Sheets API counters and their export.
+
+Code is instrumented with spans from the process-wide TIMINGS registry:
+
+    with span("deviation_scan"):
+        ...
+
+A span records its duration in a rolling window per name (for p50/p95) and, when the
+thread has a run open (one per Streamlit rerun, see start_run), in that run's totals.
+Counters record calls and payload bytes, e.g. of Sheets API requests (CountedWorksheet).
+While the registry is disabled, span() returns a shared no-op context manager and
+counters return at once, so instrumented code pays one attribute check.
+
+Runs can be appended to a JSONL file, and the rolling statistics written as a
+Prometheus text file (for the node_exporter textfile collector).
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOW = 500  # Samples kept per span name for the rolling statistics
+
+_NOOP = contextlib.nullcontext()
+
+
+class _Span:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Run:
+    """Span totals and counters of one rerun."""
+
+    def __init__(self):
+        self.started = time.time()
+        self._started = time.perf_counter()
+        self.spans = {}  # name: [count, seconds]
+        self.counters = {}  # name: [calls, bytes]
+        self.seconds = None
+
+    def frame(self):
+        """Return this run's spans as a frame (Span, Count, Total ms), slowest first."""
+        frame = pd.DataFrame(
+            [(name, count, seconds * 1000) for name, (count, seconds) in self.spans.items()],
+            columns=["Span", "Count", "Total ms"],
+        )
+        return frame.sort_values("Total ms", ascending=False, ignore_index=True)
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "seconds": self.seconds,
+            "spans": {name: {"count": count, "seconds": seconds} for name, (count, seconds) in self.spans.items()},
+            "counters": {name: {"calls": calls, "bytes": nbytes} for name, (calls, nbytes) in self.counters.items()},
+        }
+
+
+class Timings:
+    """Registry of span samples and counters, shared by all threads."""
+
+    def __init__(self, window=DEFAULT_WINDOW, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._samples = {}  # name: deque of seconds
+        self._totals = {}  # name: [count, seconds] since start
+        self._counters = {}  # name: [calls, bytes] since start
+
+    def span(self, name):
+        """Return a context manager timing its block under name (a no-op while disabled)."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+        run = getattr(self._local, "run", None)
+        if run is not None:
+            totals = run.spans.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    def count(self, name, calls=1, nbytes=0):
+        """Add calls and payload bytes to a counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            counter = self._counters.setdefault(name, [0, 0])
+            counter[0] += calls
+            counter[1] += nbytes
+        run = getattr(self._local, "run", None)
+        if run is not None:
+            counter = run.counters.setdefault(name, [0, 0])
+            counter[0] += calls
+            counter[1] += nbytes
+
+    # --- Runs --------------------------------------------------------------
+
+    def start_run(self):
+        """Open a run for the current thread (replacing any open one); returns it, or None while disabled."""
+        self._local.run = Run() if self.enabled else None
+        return self._local.run
+
+    def finish_run(self):
+        """Close the current thread's run, recording its duration as the "rerun" span; returns it or None."""
+        run = getattr(self._local, "run", None)
+        self._local.run = None
+        if run is None:
+            return None
+        run.seconds = time.perf_counter() - run._started
+        self.record("rerun", run.seconds)
+        return run
+
+    # --- Statistics --------------------------------------------------------
+
+    def stats(self):
+        """Return rolling statistics per span: Span, Count, p50 ms, p95 ms, Max ms, Total s."""
+        with self._lock:
+            rows = [
+                (name, self._totals[name][0], np.asarray(samples) * 1000, self._totals[name][1])
+                for name, samples in self._samples.items()
+            ]
+        frame = pd.DataFrame({
+            "Span": [name for name, _, _, _ in rows],
+            "Count": [count for _, count, _, _ in rows],
+            "p50 ms": [np.percentile(ms, 50) for _, _, ms, _ in rows],
+            "p95 ms": [np.percentile(ms, 95) for _, _, ms, _ in rows],
+            "Max ms": [ms.max() for _, _, ms, _ in rows],
+            "Total s": [total for _, _, _, total in rows],
+        })
+        return frame.sort_values("p95 ms", ascending=False, ignore_index=True)
+
+    def counters(self):
+        """Return the counters: Counter, Calls, Bytes."""
+        with self._lock:
+            rows = [(name, calls, nbytes) for name, (calls, nbytes) in self._counters.items()]
+        return pd.DataFrame(rows, columns=["Counter", "Calls", "Bytes"]).sort_values("Counter", ignore_index=True)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+    # --- Export ------------------------------------------------------------
+
+    def prometheus_text(self, prefix="obob"):
+        """Return the rolling statistics and counters in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_span_seconds Duration of instrumented stages (rolling window).",
+            f"# TYPE {prefix}_span_seconds summary",
+        ]
+        for name, count, p50, p95, _, total in self.stats().itertuples(index=False, name=None):
+            label = _label(name)
+            lines.append(f'{prefix}_span_seconds{{span="{label}",quantile="0.5"}} {p50 / 1000:.6f}')
+            lines.append(f'{prefix}_span_seconds{{span="{label}",quantile="0.95"}} {p95 / 1000:.6f}')
+            lines.append(f'{prefix}_span_seconds_sum{{span="{label}"}} {total:.6f}')
+            lines.append(f'{prefix}_span_seconds_count{{span="{label}"}} {count}')
+        counters = self.counters()
+        for metric, column, help_text in (
+            ("calls_total", "Calls", "Calls counted per counter."),
+            ("bytes_total", "Bytes", "Payload bytes counted per counter."),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for name, value in zip(counters["Counter"], counters[column]):
+                lines.append(f'{prefix}_{metric}{{counter="{_label(name)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix="obob"):
+        """Write prometheus_text() to path, replacing it atomically."""
+        _makedirs(path)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text(prefix))
+        os.replace(tmp, path)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _makedirs(path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+def append_jsonl(path, run):
+    """Append a run as one JSON line."""
+    _makedirs(path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run.to_dict()) + "\n")
+
+
+def _payload_bytes(value):
+    """Approximate size of a Sheets API payload, as JSON."""
+    if value is None:
+        return 0
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+
+class CountedWorksheet:
+    """Worksheet proxy that times every method call as a span and counts calls and bytes."""
+
+    def __init__(self, worksheet, timings=None):
+        self.worksheet = worksheet
+        self.timings = timings or TIMINGS
+
+    def __getattr__(self, name):
+        attr = getattr(self.worksheet, name)
+        if not callable(attr) or not self.timings.enabled:
+            return attr
+        timings = self.timings
+
+        def call(*args, **kwargs):
+            key = f"sheets.{name}"
+            with timings.span(key):
+                result = attr(*args, **kwargs)
+            timings.count(key, nbytes=_payload_bytes(result) + _payload_bytes(list(args)))
+            return result
+
+        return call
+
+
+TIMINGS = Timings()
+
+
+def span(name):
+    """Time a block under name in the process-wide registry (see Timings.span)."""
+    return TIMINGS.span(name)
@@ -0,0 +1,220 @@
+"""Durable local write-ahead log of submitted readings.
+
+A submission is first committed to an SQLite file with an idempotency key, so it
+survives a failed or slow backend write and a restart of the app; Submit returns as
+soon as that commit is done. A background flusher writes the pending submissions to the
+storage backend in batches (one storage.append_frame per batch), in submission order.
+
+When a batch write fails, the flusher retries it with exponential backoff. A failed
+write may still have reached the backend (e.g. the Sheets API appended the rows but the
+response was lost), so every batch records the number of backend readings before its
+first attempt; before a retry, the readings appended since then are compared with the
+pending submissions and those already there are marked as written instead of being sent
+again. Keys of written submissions are kept for KEEP_DAYS, so re-submitting a key does
+not queue the reading twice.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from monitoring.schema import SHEET_COLUMNS, coerce
+
+DEFAULT_BATCH_ROWS = 500
+
+# Retry delays after failed writes: BASE_BACKOFF * 2 ** (failures - 1), at most MAX_BACKOFF seconds
+BASE_BACKOFF = 5
+MAX_BACKOFF = 120
+
+# Days the keys of written submissions are kept
+KEEP_DAYS = 7
+
+
+def _fingerprints(frame):
+    """Return one string per reading, equal for readings with the same stored values."""
+    typed = coerce(frame.reset_index(drop=True), add_missing=True)[SHEET_COLUMNS]
+    text = typed.astype(object).where(typed.notna(), "").map(str)
+    return text.agg("\x1f".join, axis=1).tolist()
+
+
+class WriteAheadLog:
+    """Pending submissions in an SQLite file, flushed to a storage backend in the background."""
+
+    def __init__(self, path, storage, batch_rows=DEFAULT_BATCH_ROWS, on_flush=None):
+        self.path = path
+        self.storage = storage
+        self.batch_rows = batch_rows
+        self.on_flush = on_flush  # Called with the number of readings written after each successful flush
+        self.last_error = None
+        self.failures = 0  # Consecutive failed flushes
+        self.retry_at = 0.0  # time.monotonic() before which no flush is attempted
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=FULL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS submissions (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "key TEXT UNIQUE NOT NULL, reading TEXT NOT NULL, submitted_at REAL NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, base INTEGER, last_error TEXT, written_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS submissions_pending ON submissions (written_at, id)")
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def submit(self, reading, key=None):
+        """Durably record a reading (a dict keyed by column name) and return its idempotency key.
+
+        A key that was already submitted is not queued again.
+        """
+        key = key or uuid.uuid4().hex
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO submissions (key, reading, submitted_at) VALUES (?, ?, ?)",
+                (key, json.dumps(reading, default=str), time.time()),
+            )
+        self._wake.set()
+        return key
+
+    def pending(self):
+        """Return the number of submissions not written to the backend yet."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM submissions WHERE written_at IS NULL").fetchone()[0]
+
+    def pending_frame(self):
+        """Return the pending submissions with their key, attempts and last error, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, reading, submitted_at, attempts, last_error FROM submissions "
+                "WHERE written_at IS NULL ORDER BY id"
+            ).fetchall()
+        readings = pd.DataFrame([json.loads(reading) for _, reading, _, _, _ in rows], columns=SHEET_COLUMNS)
+        readings.insert(0, "Key", [key for key, _, _, _, _ in rows])
+        readings["Submitted"] = pd.to_datetime([submitted for _, _, submitted, _, _ in rows], unit="s")
+        readings["Attempts"] = [attempts for _, _, _, attempts, _ in rows]
+        readings["Last Error"] = [error for _, _, _, _, error in rows]
+        return readings
+
+    def _next_batch(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, reading, base FROM submissions WHERE written_at IS NULL ORDER BY id LIMIT ?",
+                (self.batch_rows,),
+            ).fetchall()
+
+    def _mark_written(self, ids):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE submissions SET written_at = ?, last_error = NULL WHERE id = ?", [(now, i) for i in ids]
+            )
+            self._conn.execute("DELETE FROM submissions WHERE written_at < ?", (now - KEEP_DAYS * 86400,))
+
+    def _mark_attempt(self, ids, base, error):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE submissions SET attempts = attempts + 1, base = COALESCE(base, ?), last_error = ? WHERE id = ?",
+                [(base, error, i) for i in ids],
+            )
+
+    def _already_written(self, batch, readings):
+        """Return the ids of a retried batch whose readings reached the backend on an earlier attempt."""
+        base = min(row[2] for row in batch if row[2] is not None)
+        self.storage.sync()
+        appended = self.storage.page(base, self.storage.count() - base, columns=SHEET_COLUMNS)
+        if appended.empty:
+            return set()
+        available = {}
+        for fingerprint in _fingerprints(appended):
+            available[fingerprint] = available.get(fingerprint, 0) + 1
+        written = set()
+        for (i, _, row_base), fingerprint in zip(batch, _fingerprints(readings)):
+            # Only submissions from a failed attempt can be there, once per matching reading
+            if row_base is not None and available.get(fingerprint, 0) > 0:
+                available[fingerprint] -= 1
+                written.add(i)
+        return written
+
+    def flush(self):
+        """Write pending submissions to the backend in batches. Returns the number of readings written.
+
+        Raises the backend error of a failed batch (earlier batches stay written).
+        """
+        with self._flush_lock:
+            total = 0
+            try:
+                while True:
+                    batch = self._next_batch()
+                    if not batch:
+                        break
+                    total += self._flush_batch(batch)
+            except Exception as e:
+                self.last_error = e
+                self.failures += 1
+                self.retry_at = time.monotonic() + min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (self.failures - 1))
+                raise
+            finally:
+                if total and self.on_flush is not None:
+                    self.on_flush(total)
+            self.last_error = None
+            self.failures = 0
+            self.retry_at = 0.0
+            return total
+
+    def _flush_batch(self, batch):
+        readings = pd.DataFrame([json.loads(reading) for _, reading, _ in batch])
+        ids = [i for i, _, _ in batch]
+        base = None
+        try:
+            if any(row_base is not None for _, _, row_base in batch):
+                written = self._already_written(batch, readings)
+                if written:
+                    self._mark_written(sorted(written))
+                    keep = [k for k, i in enumerate(ids) if i not in written]
+                    readings = readings.iloc[keep].reset_index(drop=True)
+                    ids = [ids[k] for k in keep]
+                    if not ids:
+                        return len(written)
+            self.storage.sync()
+            base = self.storage.count()
+            self.storage.append_frame(readings)
+        except Exception as e:
+            self._mark_attempt(ids, base, str(e))
+            raise
+        self._mark_written(ids)
+        return len(batch)
+
+    # --- Background flush --------------------------------------------------
+
+    def start(self, interval):
+        """Flush new submissions right away and retry failed ones at least every `interval` seconds."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="wal-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # Kept in last_error; the submissions stay pending
+            if self.failures:
+                # Backing off: new submissions wait for the retry as well
+                self._stop.wait(max(self.retry_at - time.monotonic(), 0))
+            else:
+                self._wake.wait(interval)
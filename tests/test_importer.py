@@ -0,0 +1,43 @@
+import io
+
+from monitoring.importer import import_file
+from monitoring.storage import SQLiteStorage
+from monitoring.thresholds import load_thresholds
+
+
+def _import(tmp_path, text, chunk_rows=2):
+    table = load_thresholds()
+    storage = SQLiteStorage(str(tmp_path / "obob.sqlite3"))
+    report = import_file(storage, io.StringIO(text), "readings.csv", table, chunk_rows=chunk_rows)
+    return storage, report
+
+
+def test_rows_are_rejected_with_one_message_per_rule(tmp_path):
+    tag = load_thresholds().tags[0]
+    storage, report = _import(tmp_path, "\n".join([
+        "Date,Equipment,Is Running,Driving End Temp,Remarks",
+        f"2024-05-01,{tag},TRUE,55.5,ok",
+        f"not a date,{tag},TRUE,55.5,",
+        "2024-05-01,NO-SUCH-TAG,TRUE,55.5,",
+        f"2024-05-02,{tag},TRUE,hot,",
+        f"2024-05-03,{tag},FALSE,,",
+    ]))
+
+    assert report.error is None
+    assert (report.rows_read, report.rows_imported, report.rows_rejected) == (5, 2, 3)
+    assert report.ignored_columns == ["Remarks"]
+    assert report.errors == [
+        (3, "invalid Date"),
+        (4, "unknown Equipment tag"),
+        (5, "non-numeric Driving End Temp"),
+    ]
+    assert storage.count() == 2
+
+
+def test_a_missing_required_column_stops_the_import(tmp_path):
+    storage, report = _import(tmp_path, "Date,Equipment,Driving End Temp\n2024-05-01,1670-PA-02A,55.5\n")
+
+    assert isinstance(report.error, ValueError)
+    assert str(report.error) == "The file is missing columns: Is Running"
+    assert (report.rows_read, report.rows_imported, report.rows_rejected) == (0, 0, 0)
+    assert storage.count() == 0
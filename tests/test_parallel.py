@@ -0,0 +1,46 @@
+import pytest
+
+from monitoring.analytics import weekly_deviations
+from monitoring.parallel import Evaluator
+from monitoring.rolling import RollingStats
+from monitoring.synthetic import generate
+from monitoring.thresholds import load_thresholds, violation_matrix
+
+
+@pytest.fixture(scope="module")
+def table():
+    return load_thresholds()
+
+
+def _assert_same_as_serial(evaluator, data, table):
+    assert evaluator.violations(data).equals(violation_matrix(data, table))
+
+    parallel, serial = evaluator.weekly_report(data), weekly_deviations(data, table)
+    assert parallel[0] == serial[0]
+    assert parallel[1].equals(serial[1])
+    assert parallel[2].equals(serial[2])
+    assert parallel[3] == serial[3]
+
+    parallel_stats, serial_stats = RollingStats(table), RollingStats(table)
+    evaluator.update_rolling(parallel_stats, data)
+    serial_stats.update_frame(data)
+    assert parallel_stats.snapshot().equals(serial_stats.snapshot())
+
+
+@pytest.mark.parametrize("by", ["equipment", "area"])
+def test_only_unknown_tags(table, by):
+    data = generate(table, 45, seed=1)
+    data["Equipment"] = "UNKNOWN-TAG"
+    _assert_same_as_serial(Evaluator(table, workers=2, by=by, kind="thread", min_rows=0), data, table)
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+@pytest.mark.parametrize("by", ["equipment", "area"])
+def test_same_as_serial(table, kind, by):
+    data = generate(table, 3000, seed=2)
+    data.loc[:9, "Equipment"] = "UNKNOWN-TAG"
+    evaluator = Evaluator(table, workers=2, by=by, kind=kind, min_rows=0)
+    try:
+        _assert_same_as_serial(evaluator, data.iloc[::-1], table)
+    finally:
+        evaluator.close()
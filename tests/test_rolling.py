@@ -0,0 +1,37 @@
+import numpy as np
+
+from monitoring.rolling import RollingStats, TrendMonitor
+from monitoring.storage import SQLiteStorage
+from monitoring.synthetic import generate
+from monitoring.thresholds import load_thresholds
+
+
+def test_seed_fills_the_same_windows_as_reading_by_reading():
+    table = load_thresholds()
+    data = generate(table, 2000, seed=4)
+    data.loc[::7, "Driving End Temp"] = np.nan
+    data.loc[3, "Equipment"] = "UNKNOWN-TAG"
+
+    seeded, replayed = RollingStats(table), RollingStats(table)
+    seeded.seed(data)
+    replayed.update_frame(data)
+
+    columns = ["Equipment", "Metric", "Readings", "Last", "Mean", "Std", "Slope per Day"]
+    assert seeded.snapshot()[columns].equals(replayed.snapshot()[columns])
+    assert np.array_equal(seeded._count, replayed._count)
+
+
+def test_trend_monitor_catches_up_then_adds_new_readings(tmp_path):
+    table = load_thresholds()
+    data = generate(table, 1500, seed=5)
+    storage = SQLiteStorage(str(tmp_path / "obob.sqlite3"))
+    storage.append_frame(data.iloc[:1000])
+
+    monitor = TrendMonitor(storage, table)
+    assert monitor.update() == 1000
+    storage.append_frame(data.iloc[1000:])
+    assert monitor.update() == 500
+
+    replayed = RollingStats(table, monitor.stats.window, monitor.stats.alpha)
+    replayed.update_frame(storage.read_all())
+    assert np.array_equal(monitor.stats._values, replayed._values, equal_nan=True)
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from monitoring.analytics import kpi_series, kpis, running_percentage_by_area
+from monitoring.rollup import rollup_by, summarize
+from monitoring.schema import coerce
+from monitoring.storage import SQLiteStorage
+from monitoring.synthetic import generate
+from monitoring.thresholds import load_thresholds
+
+
+def _readings():
+    data = generate(load_thresholds(), 400, seed=6)
+    data.loc[:49, "Date"] = pd.NaT
+    return data
+
+
+def test_undated_readings_count_in_totals_but_not_per_date():
+    data = _readings()
+    daily = summarize(coerce(data))
+
+    totals = rollup_by(daily, []).iloc[0]
+    assert totals["Readings"] == len(data)
+    assert totals["Running"] == data["Is Running"].sum()
+    assert kpis(daily)["running_percentage"] == data["Is Running"].mean() * 100
+
+    by_area = running_percentage_by_area(daily).set_index("Area")["Running Percentage (%)"]
+    expected = data.groupby("Area")["Is Running"].mean() * 100
+    assert (by_area - expected).abs().max() < 1e-9
+
+    avg_temp_trend, _ = kpi_series(daily)
+    assert avg_temp_trend["Date"].notna().all()
+    assert rollup_by(daily, ["Date"])["Readings"].sum() == len(data) - 50
+
+
+def test_sqlite_rollup_merges_undated_readings_across_appends(tmp_path):
+    data = _readings()
+    storage = SQLiteStorage(str(tmp_path / "obob.sqlite3"))
+    storage.append_frame(data.iloc[:25])
+    storage.append_frame(data.iloc[25:])
+
+    daily = storage.daily_rollup()
+    assert rollup_by(daily, [])["Readings"].iloc[0] == len(data)
+    assert not daily[daily["Date"].isna()].duplicated(["Area", "Equipment"]).any()
@@ -0,0 +1,45 @@
+import json
+
+from monitoring.schema import SHEET_COLUMNS
+from monitoring.storage import GoogleSheetsStorage, SQLiteStorage
+from monitoring.sync import SheetMirror
+from monitoring.synthetic import generate
+from monitoring.thresholds import load_thresholds
+
+
+class JsonWorksheet:
+    """Worksheet stand-in that serializes appended rows to JSON, as gspread does."""
+
+    def __init__(self):
+        self.rows = []
+
+    def row_values(self, row):
+        if row == 1:
+            return list(SHEET_COLUMNS)
+        return self.get(f"{row}:{row}")[0] if row - 1 <= len(self.rows) else []
+
+    def get(self, cell_range):
+        first, last = (int(part) for part in cell_range.split(":"))
+        # Sheets returns formatted cell values: booleans as TRUE/FALSE, everything else as text
+        return [
+            [("TRUE" if value else "FALSE") if isinstance(value, bool) else str(value) for value in row]
+            for row in self.rows[first - 2:last - 1]
+        ]
+
+    def append_rows(self, rows, **kwargs):
+        self.rows.extend(json.loads(json.dumps(rows)))
+
+
+def test_backends_accept_the_same_typed_frame(tmp_path):
+    data = generate(load_thresholds(), 500, seed=3)
+    data.loc[:4, "Driving End Temp"] = float("nan")
+
+    worksheet = JsonWorksheet()
+    sheets = GoogleSheetsStorage(lambda: worksheet, SheetMirror(lambda: worksheet, str(tmp_path / "sheet2")))
+    sheets.append_frame(data)
+    sheets.sync()
+    sqlite = SQLiteStorage(str(tmp_path / "obob.sqlite3"))
+    sqlite.append_frame(data)
+
+    assert sheets.count() == sqlite.count() == len(data)
+    assert sheets.read_all().equals(sqlite.read_all())
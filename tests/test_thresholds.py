@@ -0,0 +1,48 @@
+import pandas as pd
+
+from monitoring.thresholds import METRICS, load_thresholds, recommendations_by_row, violation_matrix
+
+NDE_AXIAL = "NDE Axial RMS (mm/s)"
+MOTOR_NDE_AXIAL = "Motor NDE Axial RMS (mm/s)"
+
+
+def _readings(table):
+    tag = table.tags[0]
+    rows = []
+    for equipment, metric, value in [
+        (tag, NDE_AXIAL, 5.9),
+        (tag, NDE_AXIAL, 6.1),
+        (tag, MOTOR_NDE_AXIAL, 6.0),
+        (tag, MOTOR_NDE_AXIAL, 6.5),
+        ("UNKNOWN-TAG", NDE_AXIAL, 99.0),
+    ]:
+        # Every other measurement well inside its 0-70 (temperature) or 0-6 (vibration) range
+        reading = {metric: (50.0 if "Temp" in metric else 2.0) for metric in METRICS}
+        reading.update({"Equipment": equipment, metric: value, "DE Oil Level": "Normal", "NDE Oil Level": "Normal"})
+        rows.append(reading)
+    return pd.DataFrame(rows)
+
+
+def test_violations_match_a_row_by_row_check_of_the_limits():
+    table = load_thresholds()
+    data = _readings(table)
+    violations = violation_matrix(data, table)
+
+    for i, row in data.iterrows():
+        limits = table.limits(row["Equipment"]) if row["Equipment"] in table else {}
+        for metric in METRICS:
+            expected = metric in limits and not limits[metric]["min"] <= row[metric] <= limits[metric]["max"]
+            assert violations.at[i, metric] == expected, (i, metric)
+
+    flagged = violations.columns[violations.any(axis=0)].tolist()
+    assert flagged == [NDE_AXIAL, MOTOR_NDE_AXIAL]
+    assert violations.any(axis=1).tolist() == [False, True, False, True, False]
+
+
+def test_recommendations_quote_the_axial_limits():
+    table = load_thresholds()
+    data = _readings(table)
+    messages = recommendations_by_row(data, violation_matrix(data, table), table)
+    assert len(messages) == 2
+    assert all(len(row) == 1 and "outside the range 0 - 6 mm/s" in row[0] for row in messages)
+    assert all(table.tags[0] in row[0] for row in messages)
@@ -0,0 +1,59 @@
+import pytest
+
+from monitoring import wal
+from monitoring.schema import SHEET_COLUMNS
+from monitoring.storage import SQLiteStorage
+from monitoring.synthetic import generate, sheet_rows
+from monitoring.thresholds import load_thresholds
+from monitoring.wal import WriteAheadLog
+
+
+class LostResponseStorage(SQLiteStorage):
+    """Stores the first append, then fails as if the response had been lost."""
+
+    lose_response = True
+
+    def append_frame(self, frame):
+        super().append_frame(frame)
+        if self.lose_response:
+            self.lose_response = False
+            raise ConnectionError("response lost")
+
+
+class FailingStorage(SQLiteStorage):
+    def append_frame(self, frame):
+        raise ConnectionError("backend unreachable")
+
+
+def _reading(seed=0):
+    return dict(zip(SHEET_COLUMNS, sheet_rows(generate(load_thresholds(), 1, seed=seed))[0]))
+
+
+def test_retry_after_a_lost_response_does_not_duplicate_the_reading(tmp_path):
+    storage = LostResponseStorage(str(tmp_path / "obob.sqlite3"))
+    log = WriteAheadLog(str(tmp_path / "pending.sqlite3"), storage)
+    log.submit(_reading(), key="reading-1")
+
+    with pytest.raises(ConnectionError):
+        log.flush()
+    assert storage.count() == 1
+    assert log.pending() == 1
+
+    assert log.flush() == 1
+    assert storage.count() == 1
+    assert log.pending() == 0
+
+
+def test_failed_flushes_back_off_exponentially_up_to_the_maximum(tmp_path, monkeypatch):
+    monkeypatch.setattr(wal.time, "monotonic", lambda: 1000.0)
+    log = WriteAheadLog(str(tmp_path / "pending.sqlite3"), FailingStorage(str(tmp_path / "obob.sqlite3")))
+    log.submit(_reading())
+
+    delays = []
+    for _ in range(7):
+        with pytest.raises(ConnectionError):
+            log.flush()
+        delays.append(log.retry_at - 1000.0)
+    assert delays == [5, 10, 20, 40, 80, 120, 120]
+    assert log.failures == 7
+    assert log.pending() == 1